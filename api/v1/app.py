@@ -2,12 +2,32 @@
 """Api for AirBnB_clone"""
 from api.v1.views import app_views
 from flask import Blueprint, Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
 from models import storage
+from models.engine import codec
 from os import getenv
 from flask_cors import CORS
 from flasgger import Swagger
 
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Serializes the api responses with the storage JSON codec"""
+
+    def dumps(self, obj, **kwargs):
+        """Encode obj, jsonify's pretty printing falls back to json, the
+        types the codec does not know (Decimal, date...) go through
+        Flask's default"""
+        kwargs.pop("separators", None)
+        default = kwargs.pop("default", self.default)
+        return codec.dumps(obj, default=default, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """Decode a request body"""
+        return codec.loads(s)
+
+
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 swagger = Swagger(app)
 app.register_blueprint(app_views)
 CORS(app, resources={"/*": {"origins": ["0.0.0.0"]}})
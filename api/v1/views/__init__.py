@@ -1,10 +1,31 @@
 #!/usr/bin/python3
 """Initializer for Blueprint"""
-from flask import Blueprint
+from flask import Blueprint, Response, stream_with_context
 
 
 app_views = Blueprint("app_views", __name__, url_prefix='/api/v1')
 
+
+def jsonify_list(objs, chunk=100):
+    """Response listing the public representation of objs, concatenated
+    from the JSON each of them caches and streamed chunk objects at a
+    time, so that objs may be an iterator over a large table"""
+    def generate():
+        """yields the JSON array, chunk objects at a time"""
+        parts = ["["]
+        separator = ""
+        for obj in objs:
+            parts.append(separator + obj.to_json())
+            separator = ","
+            if len(parts) >= chunk:
+                yield "".join(parts)
+                parts = []
+        parts.append("]\n")
+        yield "".join(parts)
+    return Response(stream_with_context(generate()),
+                    mimetype="application/json")
+
+
 from api.v1.views.index import *
 from api.v1.views.states import *
 from api.v1.views.cities import *
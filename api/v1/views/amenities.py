@@ -5,7 +5,7 @@ from flask import jsonify, abort, request, Response
 from sqlalchemy.sql.expression import insert
 from models.amenity import Amenity
 from models import storage
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_list
 
 
 @app_views.route('/amenities/', methods=["GET"], strict_slashes=False)
@@ -18,11 +18,7 @@ def amenities():
         examples:
           states: [{"name":'wifi'}, {"name":'bathrooms'}, {"name":'pool'}]
     """
-    amenities = storage.all(Amenity)
-    new_dict = []
-    for amenity in amenities:
-        new_dict.append(amenities[amenity].to_dict())
-    return jsonify(new_dict)
+    return jsonify_list(storage.iter(Amenity))
 
 
 @app_views.route('/amenities/<amenity_id>', methods=["GET"],
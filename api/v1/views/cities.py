@@ -5,7 +5,7 @@ from sqlalchemy.sql.expression import insert
 from models.city import City
 from models.state import State
 from models import storage
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_list
 
 
 @app_views.route('states/<state_id>/cities/',
@@ -25,13 +25,10 @@ def city(state_id=None):
                     {"name":'Colorado'},
                 ]
     """ 
-    state = storage.get(State, state_id)
+    state = storage.get(State, state_id, load=["cities"])
     if state is None:
         abort(404)
-    new_dict = []
-    for city in state.cities:
-        new_dict.append(city.to_dict())
-    return jsonify(new_dict)
+    return jsonify_list(state.cities)
 
 
 @app_views.route('/cities/<city_id>', methods=["GET"],
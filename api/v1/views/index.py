@@ -1,14 +1,8 @@
 #!/usr/bin/python3
 """Index for our web flask"""
-from flask import jsonify
+from flask import abort, jsonify
 from api.v1.views import app_views
-from models import storage
-from models.amenity import Amenity
-from models.city import City
-from models.place import Place
-from models.review import Review
-from models.state import State
-from models.user import User
+from models import storage, storage_t
 
 
 @app_views.route('/status', strict_slashes=False)
@@ -41,11 +35,43 @@ def stats():
                     },
                 ]
     """
+    counts = storage.counts()
     return jsonify({
-        "ammenities": storage.count(Amenity),
-        "cities": storage.count(City),
-        "places": storage.count(Place),
-        "reviews": storage.count(Review),
-        "states": storage.count(State),
-        "users": storage.count(User),
+        "ammenities": counts["Amenity"],
+        "cities": counts["City"],
+        "places": counts["Place"],
+        "reviews": counts["Review"],
+        "states": counts["State"],
+        "users": counts["User"],
     })
+
+
+@app_views.route('/stats/pool', strict_slashes=False)
+def pool_stats():
+    """
+    Display the counters and the state of the database connection pool
+    ---
+    responses:
+      200:
+        description: The pool counters, with the database storage only
+        examples:
+          pool:
+                {
+                    "checkouts": "<number>",
+                    "connects": "<number>",
+                    "overflow_checkouts": "<number>",
+                    "timeouts": "<number>",
+                    "wait_seconds": "<seconds>",
+                    "max_wait_seconds": "<seconds>",
+                    "size": "<number>",
+                    "checked_in": "<number>",
+                    "checked_out": "<number>",
+                    "overflow": "<number>",
+                    "pool": "QueuePool"
+                }
+      404:
+        description: The storage is not a database
+    """
+    if storage_t != "db":
+        abort(404)
+    return jsonify(storage.pool_stats())
@@ -7,7 +7,7 @@ from models.city import City
 from models.state import State
 from models.place import Place
 from models import storage
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_list
 
 
 @app_views.route('cities/<city_id>/places',
@@ -27,13 +27,10 @@ def place(city_id=None):
                     {"name":'My big house'},
                 ]
     """ 
-    city = storage.get(City, city_id)
+    city = storage.get(City, city_id, load=["places"])
     if city is None:
         abort(404)
-    new_dict = []
-    for place in city.places:
-        new_dict.append(place.to_dict())
-    return jsonify(new_dict)
+    return jsonify_list(city.places)
 
 
 @app_views.route('/places/<place_id>', methods=["GET"],
@@ -5,7 +5,7 @@ from flask import jsonify, abort, request, Response
 from sqlalchemy.sql.expression import insert
 from models.state import State
 from models import storage
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_list
 
 
 @app_views.route('/states/', methods=["GET"], strict_slashes=False)
@@ -24,11 +24,7 @@ def states():
                     {"name":'Colorado'},
                 ]
     """
-    states = storage.all(State)
-    new_dict = []
-    for state in states:
-        new_dict.append(states[state].to_dict())
-    return jsonify(new_dict)
+    return jsonify_list(storage.iter(State))
 
 
 @app_views.route('/states/<state_id>', methods=["GET"],
@@ -4,7 +4,7 @@ from flask import jsonify, abort, request, Response
 from sqlalchemy.sql.expression import insert
 from models.user import User
 from models import storage
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_list
 
 
 @app_views.route('/users/', methods=["GET"], strict_slashes=False)
@@ -35,11 +35,7 @@ def users():
                     },
                 ]
     """
-    users = storage.all(User)
-    new_dict = []
-    for user in users:
-        new_dict.append(users[user].to_dict())
-    return jsonify(new_dict)
+    return jsonify_list(storage.iter(User))
 
 
 @app_views.route('/users/<user_id>', methods=["GET"],
@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+"""
+Compares the JSON codecs on a synthetic store shaped like file.json
+usage: ./benchmarks/bench_codec.py [number of objects]
+"""
+from datetime import datetime
+import os
+import sys
+import time
+import uuid
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models.engine import codec  # noqa: E402
+
+
+def records(n):
+    """yields n Place-like records, datetimes not yet formatted"""
+    now = datetime.utcnow()
+    city_id = str(uuid.uuid4())
+    user_id = str(uuid.uuid4())
+    for i in range(n):
+        yield {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now,
+               "__class__": "Place", "city_id": city_id, "user_id": user_id,
+               "name": "Place {}".format(i), "description": "A nice place",
+               "number_rooms": i % 5, "number_bathrooms": i % 3,
+               "max_guest": i % 8, "price_by_night": i % 300,
+               "latitude": 37.77, "longitude": -122.43}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    store = list(records(n))
+    print("{} objects, default codec: {}".format(n, codec.name))
+    for name, (dumps, loads) in sorted(codec.codecs.items()):
+        start = time.perf_counter()
+        lines = [dumps(record) for record in store]
+        encode = time.perf_counter() - start
+        size = sum(len(line) for line in lines)
+        start = time.perf_counter()
+        for line in lines:
+            loads(line)
+        decode = time.perf_counter() - start
+        print("{:<8} encode {:>10.0f} obj/s {:>7.1f} MB/s   "
+              "decode {:>10.0f} obj/s {:>7.1f} MB/s".format(
+                  name, n / encode, size / encode / 1e6,
+                  n / decode, size / decode / 1e6))
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""
+Compares the memory held per Place instance with and without the compact
+models (HBNB_COMPACT_MODELS=1), objects being built from records the way
+FileStorage.reload builds them
+usage: ./benchmarks/bench_memory.py [number of objects]
+"""
+from datetime import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import uuid
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def records(n):
+    """returns n Place-like records as decoded from file.json: each record
+    holds its own copy of the strings, foreign keys included"""
+    now = datetime.utcnow().isoformat()
+    city_ids = [str(uuid.uuid4()) for i in range(100)]
+    user_ids = [str(uuid.uuid4()) for i in range(1000)]
+    return [{"id": str(uuid.uuid4()), "created_at": now[:],
+             "updated_at": now[:], "__class__": "Place",
+             "city_id": city_ids[i % 100].encode().decode(),
+             "user_id": user_ids[i % 1000].encode().decode(),
+             "name": "Place {}".format(i), "number_rooms": i % 5,
+             "price_by_night": i % 300, "latitude": 37.77 + i / 1e6}
+            for i in range(n)]
+
+
+def measure(n):
+    """prints the bytes still allocated per Place built from n records
+    once the records are gone, strings the objects keep included"""
+    from models.place import Place
+    tracemalloc.start()
+    store = records(n)
+    objs = [Place(**record) for record in store]
+    del store
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("{:<8} {:>6.0f} bytes/object".format(
+        "compact" if os.environ["HBNB_COMPACT_MODELS"] == "1" else "dict",
+        size / len(objs)))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    if os.environ.get("HBNB_COMPACT_MODELS") is not None:
+        measure(n)
+        sys.exit(0)
+    print("{} Place objects".format(n))
+    # each mode runs in a fresh interpreter, in an empty directory so that
+    # the storage starts without a file.json
+    with tempfile.TemporaryDirectory() as tmp:
+        for compact in ("0", "1"):
+            subprocess.run([sys.executable, os.path.abspath(__file__),
+                            str(n)], cwd=tmp, check=True,
+                           env=dict(os.environ, HBNB_COMPACT_MODELS=compact))
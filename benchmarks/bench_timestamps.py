@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+"""
+Compares strptime/strftime with the timestamp helpers of the codec
+module over the created_at/updated_at of a synthetic store
+usage: ./benchmarks/bench_timestamps.py [number of records]
+"""
+from datetime import datetime, timedelta
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models.engine import codec  # noqa: E402
+
+
+def rate(n, function, values):
+    """returns the number of calls of function per second over values"""
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return n / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    start = datetime(2017, 3, 25, 2, 17, 6)
+    dates = [start + timedelta(seconds=i, microseconds=i) for i in range(n)]
+    strings = [date.strftime(codec.time) for date in dates]
+    print("{} timestamps".format(n))
+    print("parse   strptime        {:>10.0f} /s".format(
+        rate(n, lambda s: datetime.strptime(s, codec.time), strings)))
+    print("parse   parse_timestamp {:>10.0f} /s".format(
+        rate(n, codec.parse_timestamp, strings)))
+    print("format  strftime        {:>10.0f} /s".format(
+        rate(n, lambda d: d.strftime(codec.time), dates)))
+    codec.timestamp.cache_clear()
+    print("format  timestamp       {:>10.0f} /s (cold cache)".format(
+        rate(n, codec.timestamp, dates)))
+    recent = dates[-10000:] * (n // 10000)
+    print("format  timestamp       {:>10.0f} /s (the last 10000 "
+          "formatted again)".format(rate(len(recent), codec.timestamp,
+                                         recent)))
@@ -0,0 +1,32 @@
+#!/usr/bin/python3
+"""
+Measures the per-object cost of BaseModel.to_dict
+usage: ./benchmarks/bench_to_dict.py [number of objects]
+"""
+import os
+import sys
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models.place import Place  # noqa: E402
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    places = [Place(name="place {}".format(i), city_id="c", user_id="u",
+                    number_rooms=i % 5, price_by_night=i % 300)
+              for i in range(n)]
+
+    def public():
+        """serializes every place as the api views do"""
+        for place in places:
+            place.to_dict()
+
+    def persisted():
+        """serializes every place as FileStorage.save does"""
+        for place in places:
+            place.to_dict(save_fs=1)
+
+    for name, func in [("to_dict()", public),
+                       ("to_dict(save_fs=1)", persisted)]:
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print("{:<20} {:>10.2f} us/object".format(name, best / n * 1e6))
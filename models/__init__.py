@@ -7,6 +7,8 @@ from os import getenv
 
 
 storage_t = getenv("HBNB_TYPE_STORAGE")
+# compact file mode models: columns in slots, timestamps as integers
+compact = storage_t != "db" and bool(int(getenv("HBNB_COMPACT_MODELS", 0)))
 
 if storage_t == "db":
     from models.engine.db_storage import DBStorage
@@ -3,15 +3,21 @@
 Contains class BaseModel
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import models
+from models.engine import codec
 from os import getenv
 from sqlalchemy import Column, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
+import sys
 import uuid
-import inspect
+import weakref
 
-time = "%Y-%m-%dT%H:%M:%S.%f"
+time = codec.time
+epoch = datetime(1970, 1, 1)
+# [public to_dict(), its JSON or None] of each instance, dropped as soon
+# as one of its attributes is set
+serialized = weakref.WeakKeyDictionary()
 
 if models.storage_t == "db":
     Base = declarative_base()
@@ -19,64 +25,184 @@ else:
     Base = object
 
 
-class BaseModel:
+class Compact(type):
+    """metaclass of the compact models (HBNB_COMPACT_MODELS=1)
+    the columns a class declares with their default value become slots,
+    the defaults being returned until the slot is set"""
+
+    def __new__(mcs, name, bases, namespace):
+        """moves the declared columns of namespace to __slots__"""
+        defaults = {}
+        for base in reversed(bases):
+            defaults.update(getattr(base, "_defaults", {}))
+        columns = [key for key, value in namespace.items()
+                   if not key.startswith("_") and
+                   type(value) in (str, int, float, list)]
+        for key in columns:
+            defaults[key] = namespace.pop(key)
+        namespace["__slots__"] = tuple(namespace.get("__slots__", ())) + \
+            tuple(columns)
+        namespace["_defaults"] = defaults
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._slots = [(key, cls.__dict__[key]) for key in cls.__slots__
+                      if key not in ("__dict__", "__weakref__")] + \
+            getattr(super(cls, cls), "_slots", [])
+        return cls
+
+
+class BaseModel(metaclass=Compact if models.compact else type):
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow)
+    elif models.compact:
+        # the timestamps are kept as microseconds since the epoch, the
+        # attributes outside the columns in the lazily created __dict__
+        __slots__ = ("id", "_created_at", "_updated_at", "__dict__",
+                     "__weakref__")
+
+        def __getattr__(self, name):
+            """returns the default of a column not set yet"""
+            try:
+                return type(self)._defaults[name]
+            except KeyError:
+                raise AttributeError("'{}' object has no attribute '{}'"
+                                     .format(type(self).__name__, name))
+
+        def __get_time(slot):
+            """returns the property converting the slot to a datetime"""
+            def getter(self):
+                value = getattr(self, slot)
+                if type(value) is int:
+                    return epoch + timedelta(microseconds=value)
+                return value
+
+            def setter(self, value):
+                if type(value) is datetime and value.tzinfo is None:
+                    value = (value - epoch) // timedelta(microseconds=1)
+                setattr(self, slot, value)
+
+            def deleter(self):
+                delattr(self, slot)
+            return property(getter, setter, deleter)
+
+        created_at = __get_time("_created_at")
+        updated_at = __get_time("_updated_at")
+        del __get_time
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
         if kwargs:
+            # nothing is cached yet, the attributes are set directly
+            set_attribute = super().__setattr__
             for key, value in kwargs.items():
                 if key != "__class__":
-                    setattr(self, key, value)
+                    # the same parent id is repeated by every child
+                    # record, interning keeps a single copy of it
+                    if type(value) is str and key.endswith("_id"):
+                        value = sys.intern(value)
+                    set_attribute(key, value)
             if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
-            else:
-                self.created_at = datetime.utcnow()
+                set_attribute("created_at",
+                              codec.parse_timestamp(kwargs["created_at"]))
+            elif type(kwargs.get("created_at", None)) is not datetime:
+                set_attribute("created_at", datetime.utcnow())
             if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
-            else:
-                self.updated_at = datetime.utcnow()
+                set_attribute("updated_at",
+                              codec.parse_timestamp(kwargs["updated_at"]))
+            elif type(kwargs.get("updated_at", None)) is not datetime:
+                set_attribute("updated_at", datetime.utcnow())
             if kwargs.get("id", None) is None:
-                self.id = str(uuid.uuid4())
+                set_attribute("id", str(uuid.uuid4()))
         else:
             self.id = str(uuid.uuid4())
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    def __setattr__(self, name, value):
+        """sets an attribute and drops the cached serialization; the file
+        storage marks a stored object for its next save (and reindexes
+        it when a foreign key is set)"""
+        super().__setattr__(name, value)
+        serialized.pop(self, None)
+        if models.storage_t != "db":
+            models.storage.changed(self, name)
+
+    def __delattr__(self, name):
+        """deletes an attribute and drops the cached serialization"""
+        super().__delattr__(name)
+        serialized.pop(self, None)
 
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
-                                         self.__dict__)
+                                         self._fields())
+
+    def _fields(self):
+        """returns a new dictionary of the attributes set on the instance
+        (its __dict__, plus the set slots of a compact model)"""
+        if not models.compact:
+            return self.__dict__.copy()
+        fields = {}
+        for key, slot in type(self)._slots:
+            try:
+                fields[key] = slot.__get__(self)
+            except AttributeError:
+                pass
+        for key in ("created_at", "updated_at"):
+            if "_" + key in fields:
+                fields[key] = getattr(self, key)
+                del fields["_" + key]
+        # object.__getstate__ only exists from Python 3.11 on
+        extras = getattr(self, "__dict__", None)
+        if extras:
+            fields.update(extras)
+        return fields
 
     def save(self):
-        """updates the attribute 'updated_at' with the current datetime"""
+        """updates the attribute 'updated_at' with the current datetime
+        (which drops the cached serialization, should a mutable attribute
+        have been changed in place)"""
         self.updated_at = datetime.utcnow()
         models.storage.new(self)
         models.storage.save()
 
-    def to_dict(self):
-        """returns a dictionary containing all keys/values of the instance"""
-        new_dict = self.__dict__.copy()
+    def to_dict(self, save_fs=None):
+        """returns a dictionary containing all keys/values of the instance
+        the password is only kept when serializing for the file storage
+        (save_fs true), never in the public representation
+        the public representation is cached until an attribute is set, a
+        copy of it is returned"""
+        if not save_fs:
+            cached = serialized.get(self)
+            if cached is not None:
+                return cached[0].copy()
+        new_dict = self._fields()
         if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
+            new_dict["created_at"] = codec.timestamp(new_dict["created_at"])
         if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
+            new_dict["updated_at"] = codec.timestamp(new_dict["updated_at"])
         new_dict["__class__"] = self.__class__.__name__
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
-        if inspect.stack()[1][3] != "save":
-                if "password" in new_dict:
-                    try:
-                        del new_dict["password"]
-                    except KeyError:
-                        pass
+        if not save_fs:
+            if "password" in new_dict:
+                del new_dict["password"]
+            serialized[self] = [new_dict.copy(), None]
         return new_dict
 
+    def to_json(self):
+        """returns the public representation (to_dict()) encoded as JSON,
+        cached along with it"""
+        cached = serialized.get(self)
+        if cached is None:
+            self.to_dict()
+            cached = serialized[self]
+        if cached[1] is None:
+            cached[1] = codec.dumps(cached[0])
+        return cached[1]
+
     def delete(self):
         """delete the current instance from the storage"""
         models.storage.delete(self)
@@ -13,7 +13,8 @@ class City(BaseModel, Base):
     """Representation of city """
     if models.storage_t == "db":
         __tablename__ = 'cities'
-        state_id = Column(String(60), ForeignKey('states.id'), nullable=False)
+        state_id = Column(String(60), ForeignKey('states.id'), nullable=False,
+                          index=True)
         name = Column(String(128), nullable=False)
         places = relationship("Place", backref="cities")
     else:
@@ -28,9 +29,4 @@ class City(BaseModel, Base):
         @property
         def places(self):
             """getter for list of city instances related to the state"""
-            place_list = []
-            all_place = models.storage.all(Place)
-            for place in all_place.values():
-                if place.city_id == self.id:
-                    place_list.append(place)
-            return place_list
+            return models.storage.children(Place, "city_id", self.id)
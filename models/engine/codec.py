@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+Contains the JSON codec shared by the file storage and the API
+the fastest installed encoder is picked (orjson, then ujson, then the
+standard json module) unless HBNB_JSON_CODEC names one explicitly
+"""
+
+from datetime import datetime
+from functools import lru_cache
+import json
+from os import getenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+# format of the timestamps of to_dict() and of file.json
+time = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+@lru_cache(maxsize=65536)
+def timestamp(value):
+    """formats a datetime the way BaseModel.to_dict does
+    isoformat() gives the same string as strftime(time), several times
+    faster, for naive datetimes; the strings are cached by value, so a
+    timestamp formatted again (updated_at equal to created_at, objects
+    serialized on each request) costs a lookup"""
+    if value.tzinfo is None:
+        return value.isoformat(timespec="microseconds")
+    return value.strftime(time)
+
+
+def parse_timestamp(value):
+    """parses a timestamp formatted the way BaseModel.to_dict does
+    fromisoformat() is tried first as it is much faster than strptime(),
+    strptime() still handles (or rejects) anything else"""
+    if len(value) == 26 and value[10] == "T" and value[19] == ".":
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            parsed = None
+        if parsed is not None and parsed.tzinfo is None:
+            return parsed
+    return datetime.strptime(value, time)
+
+
+def _default(value):
+    """encodes the values the JSON encoders do not know about"""
+    if isinstance(value, datetime):
+        return timestamp(value)
+    raise TypeError("{} is not JSON serializable".format(type(value)))
+
+
+def _chain(default):
+    """returns a default encoding datetimes as _default does and handing
+    any other value to default"""
+    def chained(value):
+        if isinstance(value, datetime):
+            return timestamp(value)
+        return default(value)
+    return chained
+
+
+def _json_dumps(obj, default=_default):
+    """encodes obj with the standard json module"""
+    return json.dumps(obj, default=default)
+
+
+def _orjson_dumps(obj, default=_default):
+    """encodes obj with orjson, datetimes go through default
+    what orjson rejects (integers wider than 64 bits) is left to json"""
+    try:
+        return orjson.dumps(obj, default=default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME).decode()
+    except TypeError:
+        return _json_dumps(obj, default)
+
+
+def _ujson_dumps(obj, default=_default):
+    """encodes obj with ujson
+    what ujson rejects (integers wider than 64 bits) is left to json"""
+    try:
+        return ujson.dumps(obj, default=default, ensure_ascii=False)
+    except (TypeError, OverflowError):
+        return _json_dumps(obj, default)
+
+
+codecs = {"json": (_json_dumps, json.loads)}
+if ujson is not None:
+    codecs["ujson"] = (_ujson_dumps, ujson.loads)
+if orjson is not None:
+    codecs["orjson"] = (_orjson_dumps, orjson.loads)
+
+name = getenv("HBNB_JSON_CODEC")
+if name not in codecs:
+    name = [codec for codec in ("orjson", "ujson", "json")
+            if codec in codecs][0]
+_dumps, loads = codecs[name]
+
+
+def dumps(obj, default=None, **kwargs):
+    """returns obj encoded as a JSON string, datetimes included; default,
+    if given, encodes the other values the encoders do not know about
+    formatting options (indent, sort_keys...) use the json module"""
+    default = _default if default is None else _chain(default)
+    if kwargs:
+        return json.dumps(obj, default=default, **kwargs)
+    return _dumps(obj, default)
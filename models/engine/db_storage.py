@@ -3,27 +3,74 @@
 Contains the class DBStorage
 """
 
+from contextlib import contextmanager
 import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine.query import Query
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import create_engine, event, exc, func, or_, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import joinedload, object_session, scoped_session, \
+    selectinload, sessionmaker
+from sqlalchemy.pool import QueuePool
+import threading
+import time
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
+# create_engine pool options set by environment variables, and how to
+# parse them; the options left unset keep the SQLAlchemy defaults
+pool_options = {"HBNB_DB_POOL_SIZE": ("pool_size", int),
+                "HBNB_DB_MAX_OVERFLOW": ("max_overflow", int),
+                "HBNB_DB_POOL_RECYCLE": ("pool_recycle", int),
+                "HBNB_DB_POOL_PRE_PING": ("pool_pre_ping",
+                                          lambda value: bool(int(value))),
+                "HBNB_DB_POOL_TIMEOUT": ("pool_timeout", float)}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool passing how long each checkout waited for a connection,
+    and whether it timed out, to the function set as on_wait"""
+    on_wait = None
+
+    def recreate(self):
+        """keeps on_wait on the pool that replaces this one"""
+        pool = super().recreate()
+        pool.on_wait = self.on_wait
+        return pool
+
+    def _do_get(self):
+        """times the wait for a connection"""
+        start = time.perf_counter()
+        timeout = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timeout = True
+            raise
+        finally:
+            if self.on_wait is not None:
+                self.on_wait(time.perf_counter() - start, timeout)
 
 
 class DBStorage:
     """interaacts with the MySQL database"""
     __engine = None
     __session = None
+    # per thread batch depth and whether a save was deferred by batch()
+    __batch = threading.local()
+    # boolean - cache the number of rows of each class, kept up to date
+    # by the inserts and deletes this process commits
+    __count_cache = bool(int(getenv("HBNB_DB_COUNT_CACHE", 0)))
+    # dictionary - cached number of rows by class name
+    __counts = {}
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -32,50 +79,280 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
+        # HBNB_DB_URL, e.g. sqlite:///hbnb.db, replaces the MySQL database
+        url = make_url(getenv('HBNB_DB_URL') or
+                       'mysql+mysqldb://{}:{}@{}/{}'.format(HBNB_MYSQL_USER,
+                                                            HBNB_MYSQL_PWD,
+                                                            HBNB_MYSQL_HOST,
+                                                            HBNB_MYSQL_DB))
+        options = {}
+        for name, (option, parse) in pool_options.items():
+            if getenv(name) is not None:
+                options[option] = parse(getenv(name))
+        # the waits for a connection are timed inside the pool, when the
+        # database uses a QueuePool, e.g. not for SQLite in memory
+        if url.get_dialect().get_pool_class(url) is QueuePool:
+            options["poolclass"] = TimedQueuePool
+        self.__engine = create_engine(url, **options)
+        self.__pool_lock = threading.Lock()
+        self.__pool_metrics = {"checkouts": 0, "connects": 0,
+                               "overflow_checkouts": 0, "timeouts": 0,
+                               "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        # pool events set on the engine follow its pool when it is
+        # recreated, and so does on_wait
+        event.listen(self.__engine, "connect", self.__pool_connect)
+        event.listen(self.__engine, "checkout", self.__pool_checkout)
+        if isinstance(self.__engine.pool, TimedQueuePool):
+            self.__engine.pool.on_wait = self.__pool_wait
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def get(self, cls, id):
+    def __pool_wait(self, wait, timeout):
+        """adds up the waits for a connection, and the timeouts"""
+        with self.__pool_lock:
+            metrics = self.__pool_metrics
+            metrics["wait_seconds"] += wait
+            if wait > metrics["max_wait_seconds"]:
+                metrics["max_wait_seconds"] = wait
+            if timeout:
+                metrics["timeouts"] += 1
+
+    def __pool_connect(self, dbapi_connection, connection_record):
+        """counts the connections the pool opens"""
+        with self.__pool_lock:
+            self.__pool_metrics["connects"] += 1
+
+    def __pool_checkout(self, dbapi_connection, connection_record,
+                        connection_proxy):
+        """counts the checkouts, and those beyond the pool size"""
+        pool = self.__engine.pool
+        with self.__pool_lock:
+            self.__pool_metrics["checkouts"] += 1
+            if isinstance(pool, QueuePool) and \
+                    pool.checkedout() > pool.size():
+                self.__pool_metrics["overflow_checkouts"] += 1
+
+    def pool_stats(self):
+        """
+        Returns the counters of the connection pool since the storage was
+        created, with the current state of the pool
+        """
+        pool = self.__engine.pool
+        with self.__pool_lock:
+            stats = dict(self.__pool_metrics)
+        if isinstance(pool, QueuePool):
+            stats.update({"size": pool.size(), "checked_in": pool.checkedin(),
+                          "checked_out": pool.checkedout(),
+                          "overflow": max(pool.overflow(), 0)})
+        if isinstance(pool, TimedQueuePool):
+            stats["pool"] = QueuePool.__name__
+        else:
+            stats["pool"] = pool.__class__.__name__
+        return stats
+
+    def get(self, cls, id, load=None):
         """
         Retrieves a single element based on cls and id
-        it returns this obj
+        it returns this obj, with the relationships named in load loaded
         """
-        if cls not in classes.values():
+        if cls in classes:
+            cls = classes[cls]
+        if cls not in classes.values() or id is None:
             return None
-        all_cls = models.storage.all(cls)
-        for value in all_cls.values():
-            if (value.id == id):
-                return value
+        return self.__session.get(cls, id, options=self.__load(cls, load))
+
+    def get_many(self, cls, ids):
+        """
+        Retrieves the elements of cls matching each id in ids
+        it returns the list of found objs, in the order of ids
+        """
+        if cls in classes:
+            cls = classes[cls]
+        if cls not in classes.values():
+            return []
+        ids = [id for id in ids if id is not None]
+        if len(ids) == 0:
+            return []
+        objs = self.__session.query(cls).filter(cls.id.in_(ids)).all()
+        by_id = {obj.id: obj for obj in objs}
+        return [by_id[id] for id in ids if id in by_id]
 
     def count(self, cls=None):
         """
         Counts the objects of a class
         and returns this number
         """
-        return len(self.all(cls))
+        if cls is None:
+            return sum(self.counts().values())
+        if cls in classes:
+            cls = classes[cls]
+        if cls not in classes.values():
+            return 0
+        name = cls.__name__
+        if name in self.__counts:
+            self.__session.flush()
+            return self.__counts[name] + self.__uncommitted().get(name, 0)
+        count = self.__session.query(func.count()).select_from(cls).scalar()
+        if self.__count_cache:
+            # the query flushed the session, its rows are not committed
+            self.__counts[name] = count - self.__uncommitted().get(name, 0)
+        return count
+
+    def counts(self):
+        """
+        Counts the objects of every class with a single query
+        and returns these numbers by class name
+        """
+        missing = [name for name in classes if name not in self.__counts]
+        counts = {}
+        if missing:
+            row = self.__session.execute(select(*[
+                select(func.count()).select_from(classes[name])
+                .scalar_subquery().label(name) for name in missing])).one()
+            counts = dict(zip(missing, row))
+        else:
+            self.__session.flush()
+        uncommitted = self.__uncommitted()
+        if self.__count_cache:
+            for name in missing:
+                self.__counts[name] = counts[name] - uncommitted.get(name, 0)
+        return {name: counts[name] if name in counts
+                else self.__counts[name] + uncommitted.get(name, 0)
+                for name in classes}
+
+    def __uncommitted(self):
+        """returns the rows the session inserted minus those it deleted
+        and did not commit yet, by class name, as recorded by the count
+        cache events"""
+        return self.__session.info.get("counts", {})
+
+    @staticmethod
+    def __count_insert(mapper, connection, target):
+        """records the insert of target until its session commits"""
+        info = object_session(target).info.setdefault("counts", {})
+        name = target.__class__.__name__
+        info[name] = info.get(name, 0) + 1
+
+    @staticmethod
+    def __count_delete(mapper, connection, target):
+        """records the delete of target until its session commits"""
+        info = object_session(target).info.setdefault("counts", {})
+        name = target.__class__.__name__
+        info[name] = info.get(name, 0) - 1
+
+    def __count_commit(self, session):
+        """applies the inserts and deletes committed to the cached counts"""
+        for name, change in session.info.pop("counts", {}).items():
+            if name in self.__counts:
+                self.__counts[name] += change
+
+    def __count_rollback(self, session):
+        """forgets the inserts and deletes rolled back"""
+        session.info.pop("counts", None)
 
-    def all(self, cls=None):
+    def all(self, cls=None, load=None):
         """query on the current database session"""
         new_dict = {}
-        for clss in classes:
-            if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
-                for obj in objs:
-                    key = obj.__class__.__name__ + '.' + obj.id
-                    new_dict[key] = obj
+        for obj in self.iter(cls, load=load):
+            key = obj.__class__.__name__ + '.' + obj.id
+            new_dict[key] = obj
         return (new_dict)
 
+    def iter(self, cls=None, batch_size=1000, load=None):
+        """yields the objects of cls, or of every class, fetching them
+        batch_size rows at a time (server side cursor) rather than
+        loading a whole table at once; load names relationships of cls
+        to load along, see get()"""
+        if cls in classes:
+            cls = classes[cls]
+        for clss in classes.values():
+            if cls is None or cls is clss:
+                yield from self.__session.query(clss).options(
+                    *self.__load(clss, load if cls else None)).yield_per(
+                        batch_size)
+
+    def __load(self, cls, load):
+        """returns the loader options of the relationships of cls named in
+        load, "cities.places" naming the places of the cities: collections
+        are loaded by one more SELECT per batch (selectinload), single
+        objects joined to the query (joinedload)"""
+        options = []
+        for path in load or ():
+            option = None
+            target = cls
+            for name in path.split("."):
+                relationships = sqlalchemy.inspect(target).relationships
+                if name not in relationships:
+                    raise ValueError("unknown relationship: {}".format(path))
+                strategy = selectinload if relationships[name].uselist \
+                    else joinedload
+                attribute = getattr(target, name)
+                if option is None:
+                    option = strategy(attribute)
+                else:
+                    option = getattr(option, strategy.__name__)(attribute)
+                target = relationships[name].mapper.class_
+            options.append(option)
+        return options
+
+    def query(self, cls):
+        """returns a Query on the objects of cls, run lazily as SQL"""
+        if cls in classes:
+            cls = classes[cls]
+        return Query(self.__query, cls)
+
+    def __query(self, query):
+        """translates query to SQL and runs it
+        None compares as in Python rather than as NULL: eq None is IS NULL
+        (as SQLAlchemy translates it), ne and in match NULL whenever None
+        is not and is among the values; lt, le, gt and ge never match it,
+        like the TypeError of Python"""
+        if query.cls not in classes.values():
+            return iter(())
+        sql = self.__session.query(query.cls)
+        for name, op, value in query.criteria:
+            column = getattr(query.cls, name)
+            if op == "in":
+                value = list(value)
+                values = [item for item in value if item is not None]
+                clause = column.in_(values)
+                if len(values) < len(value):
+                    clause = or_(clause, column.is_(None))
+            elif op == "ne" and value is not None:
+                clause = or_(column != value, column.is_(None))
+            else:
+                clause = Query.operators[op](column, value)
+            sql = sql.filter(clause)
+        for name, descending in query.order:
+            column = getattr(query.cls, name)
+            sql = sql.order_by(column.desc() if descending else column)
+        if query.size is not None:
+            sql = sql.limit(query.size)
+        return sql
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
 
+    @contextmanager
+    def batch(self):
+        """defers the commits issued by the current thread within the
+        block to a single commit when the outermost block exits"""
+        self.__batch.depth = getattr(self.__batch, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            self.__batch.depth -= 1
+            if self.__batch.depth == 0 and \
+                    getattr(self.__batch, "deferred", False):
+                self.__batch.deferred = False
+                self.save()
+
     def save(self):
         """commit all changes of the current database session"""
+        if getattr(self.__batch, "depth", 0) > 0:
+            self.__batch.deferred = True
+            return
         self.__session.commit()
 
     def delete(self, obj=None):
@@ -83,10 +360,43 @@ class DBStorage:
         if obj is not None:
             self.__session.delete(obj)
 
+    def add_indexes(self, dry_run=False):
+        """
+        Creates the indexes the models declare that the tables of an
+        existing database lack (create_all only creates missing tables);
+        an index whose columns an existing index already covers, under
+        any name, is skipped. it returns the names of the indexes created,
+        or to create when dry_run is True
+        """
+        inspector = sqlalchemy.inspect(self.__engine)
+        tables = inspector.get_table_names()
+        created = []
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = [tuple(index["column_names"])
+                        for index in inspector.get_indexes(table.name)]
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if tuple(index.columns.keys()) in existing:
+                    continue
+                if not dry_run:
+                    index.create(self.__engine)
+                created.append(index.name)
+        return created
+
     def reload(self):
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
         sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        if self.__count_cache:
+            self.__counts = {}
+            for name, listener in (("after_insert", self.__count_insert),
+                                   ("after_delete", self.__count_delete)):
+                if not event.contains(Base, name, listener):
+                    event.listen(Base, name, listener, propagate=True)
+            event.listen(sess_factory, "after_commit", self.__count_commit)
+            event.listen(sess_factory, "after_rollback",
+                         self.__count_rollback)
         Session = scoped_session(sess_factory)
         self.__session = Session
 
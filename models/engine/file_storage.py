@@ -3,89 +3,898 @@
 Contains the FileStorage class
 """
 
-import json
+import atexit
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+import mmap
 import models
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.engine import codec, snapshot
+from models.engine.query import Query
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+import os
+from os import getenv
+import threading
+import time
+import zlib
 
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
+# foreign keys indexed for the relationship properties of each class
+foreign_keys = {"City": ("state_id",), "Place": ("city_id", "user_id"),
+                "Review": ("place_id", "user_id")}
+# class of the objects each relationship property of each class returns
+relationships = {"City": {"places": "Place"},
+                 "Place": {"amenities": "Amenity", "reviews": "Review"},
+                 "State": {"cities": "City"},
+                 "User": {"places": "Place", "reviews": "Review"}}
 
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
 
+    # string - format of the file: "json", or "binary" for a compact
+    # snapshot (see models/engine/snapshot.py); both are read back
+    __format = getenv("HBNB_FILE_FORMAT", "json")
+    # boolean - mapped mode: reload maps the binary snapshot read-only
+    # instead of reading it, so that the processes serving the same file
+    # share its pages, and records are decoded when first accessed; the
+    # file is always saved as a snapshot in this mode
+    __mmap = bool(int(getenv("HBNB_FILE_MMAP", 0)))
     # string - path to the JSON file
-    __file_path = "file.json"
+    __file_path = "file.bin" if __format == "binary" or __mmap \
+        else "file.json"
+    # integer - journal mode: number of journal entries before compaction,
+    # 0 to rewrite the whole JSON file on each save
+    __journal = int(getenv("HBNB_FILE_JOURNAL", 0))
+    # integer - number of entries currently in the journal
+    __journal_len = 0
+    # integer - group commit window: saves issued within that many
+    # milliseconds share one durable write, 0 to write on each save
+    __commit_ms = int(getenv("HBNB_FILE_COMMIT_MS", 0))
+    # group commit state: saves requested, saves made durable, and
+    # whether a thread is currently gathering saves into a write
+    __commit = threading.Condition()
+    __requested = 0
+    __durable = 0
+    __leading = False
+    # integer - background flush: saves only mark the storage pending and
+    # a thread writes it at most every that many milliseconds, 0 for none
+    __flush_ms = int(getenv("HBNB_FILE_FLUSH_MS", 0))
+    __flusher = None
+    __pending = False
+    # per thread batch depth and whether a save was deferred by batch()
+    __batch = threading.local()
+    # lock held by whatever changes the objects and their registries
+    # (new, delete, reindex, reload, materializing records) and by the
+    # writes, so that a write sees, then marks clean, a consistent state
+    __lock = threading.RLock()
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - the same objects partitioned by class name
+    __classes = {}
+    # dictionary - objects by (<class name>, foreign key, value) then key
+    __children = {}
+    # dictionary - index entries currently held by each key
+    __indexed = {}
+    # dictionary - updated_at of each key as of the last load or save
+    __loaded = {}
+    # tuple - (mtime, size) of the JSON file as of the last load or save
+    __stamp = None
+    # dictionary - objects added (obj) or deleted (None) since last save
+    __dirty = {}
+    # dictionary - (obj, updated_at, JSON) of each key as last serialized
+    __records = {}
+    # boolean - lazy mode: reload keeps the records as raw JSON until
+    # they are first accessed through get, all, count or children
+    __lazy = bool(int(getenv("HBNB_FILE_LAZY", 0)))
+    # dictionary - raw records not instantiated yet, by class name then key
+    __raw = {}
+    # integer - sharded mode: each class is stored in that many files of
+    # its own (file.<class name>.json, or file.<class name>.<n>.json with
+    # the ids hashed over several files), loaded on the first access to
+    # the class and rewritten only when one of their objects changed;
+    # 0 to store everything in the single file
+    __shards = int(getenv("HBNB_FILE_SHARDS", 0))
+    # dictionary - (mtime, size) of each shard file as of its last load
+    # or save, by path, for the shards of the classes loaded
+    __shard_stamps = {}
+    # dictionary - keys each shard file held as of its last load or save
+    __shard_keys = {}
+    # snapshot.Snapshot - the mapped snapshot, None when nothing is mapped
+    __mapped = None
+    # dictionary - keys of the mapped snapshot that were instantiated,
+    # replaced or deleted since it was mapped, by class name
+    __shadowed = {}
 
-    def get(self, cls, id):
+    def get(self, cls, id, load=None):
         """
         Retrieves a single element based on cls and id
-        it returns this obj
+        it returns this obj, with the relationships named in load loaded
         """
-        if cls not in classes.values():
+        if cls not in classes.values() and cls not in classes:
             return None
+        if type(cls) is not str:
+            cls = cls.__name__
+        self.__require(cls)
+        self.__preload(cls, load)
+        key = cls + "." + str(id)
+        if key in self.__raw.get(cls, ()) or \
+                (self.__mapped is not None and key not in self.__objects):
+            self.__materialize(cls, key)
+        return self.__objects.get(key)
 
-        all_cls = models.storage.all(cls)
-        for value in all_cls.values():
-            if (value.id == id):
-                return value
+    def get_many(self, cls, ids):
+        """
+        Retrieves the elements of cls matching each id in ids
+        it returns the list of found objs, in the order of ids
+        """
+        if cls not in classes.values() and cls not in classes:
+            return []
+        if type(cls) is not str:
+            cls = cls.__name__
+        objs = []
+        for id in ids:
+            obj = self.get(cls, id)
+            if obj is not None:
+                objs.append(obj)
+        return objs
 
     def count(self, cls=None):
         """
         Counts the objects of a class
         and returns this number
         """
-        return len(self.all(cls))
+        if cls is None:
+            for cls in classes:
+                self.__require(cls)
+            raw = sum(len(keys) for keys in self.__raw.values())
+            if self.__mapped is not None:
+                raw += len(self.__mapped) - \
+                    sum(len(keys) for keys in self.__shadowed.values())
+            return len(self.__objects) + raw
+        if type(cls) is not str:
+            cls = cls.__name__
+        self.__require(cls)
+        raw = len(self.__raw.get(cls, {}))
+        if self.__mapped is not None:
+            raw += self.__mapped.count(cls) - \
+                len(self.__shadowed.get(cls, ()))
+        return len(self.__classes.get(cls, {})) + raw
 
-    def all(self, cls=None):
+    def counts(self):
+        """
+        Counts the objects of every class
+        and returns these numbers by class name
+        """
+        return {name: self.count(name) for name in classes
+                if name != "BaseModel"}
+
+    def all(self, cls=None, load=None):
         """returns the dictionary __objects"""
         if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
+            if type(cls) is not str:
+                cls = cls.__name__
+            self.__require(cls)
+            self.__preload(cls, load)
+            self.__materialize(cls)
+            return self.__classes.get(cls, {}).copy()
+        for cls in classes:
+            self.__require(cls)
+        for cls in classes if self.__mapped is not None else list(self.__raw):
+            self.__materialize(cls)
         return self.__objects
 
+    def iter(self, cls=None, batch_size=None, load=None):
+        """yields the objects of cls, or of every class, as all() returns
+        them; batch_size is for compatibility with DBStorage, the objects
+        being in memory already"""
+        yield from list(self.all(cls, load).values())
+
+    def __preload(self, cls, load):
+        """loads the classes the relationships of cls named in load return,
+        "cities.places" naming the places of the cities, so that reading
+        them is an index lookup rather than a load of their shards or
+        records"""
+        for path in load or ():
+            target = cls
+            for name in path.split("."):
+                target = relationships.get(target, {}).get(name)
+                if target is None:
+                    raise ValueError("unknown relationship: {}".format(path))
+                self.__require(target)
+                self.__materialize(target)
+
+    def children(self, cls, fk, value):
+        """returns the list of objects of cls whose fk attribute is value"""
+        if type(cls) is not str:
+            cls = cls.__name__
+        self.__require(cls)
+        self.__materialize(cls)
+        return list(self.__children.get((cls, fk, value), {}).values())
+
+    def query(self, cls):
+        """returns a Query on the objects of cls, run lazily"""
+        if type(cls) is str:
+            cls = classes.get(cls)
+        return Query(self.__query, cls)
+
+    def __query(self, query):
+        """runs query in Python over the objects of its class; an equality
+        on an indexed foreign key takes its candidates from the index"""
+        if query.cls not in classes.values():
+            return iter(())
+        name = query.cls.__name__
+        for fk, op, value in query.criteria:
+            if op == "eq" and fk in foreign_keys.get(name, ()):
+                return query.apply(self.children(name, fk, value))
+        return query.apply(self.all(name).values())
+
+    def __materialize(self, cls, key=None):
+        """instantiates the raw record of key, or all those of class cls"""
+        with self.__lock:
+            if self.__mapped is not None:
+                self.__materialize_mapped(cls, key)
+            raw = self.__raw.get(cls)
+            if raw is None:
+                return
+            for key in [key] if key is not None else list(raw):
+                record = raw.pop(key)
+                if type(record) is bytes:
+                    record = codec.loads(record)
+                self.__add(classes[record["__class__"]](**record))
+                self.__loaded[key] = self.__updated_at(record)
+            if len(raw) == 0:
+                del self.__raw[cls]
+
+    def __materialize_mapped(self, cls, key=None):
+        """instantiates the mapped record of key, or all those of class cls
+        that are not shadowed yet"""
+        shadowed = self.__shadowed.setdefault(cls, set())
+        if key is not None:
+            offset = None if key in shadowed else self.__mapped.find(key)
+            offsets = [] if offset is None else [offset]
+        elif len(shadowed) < self.__mapped.count(cls):
+            offsets = self.__mapped.offsets(cls)
+        else:
+            offsets = []
+        for offset in offsets:
+            key = self.__mapped.key(offset)
+            if key in shadowed:
+                continue
+            shadowed.add(key)
+            record = self.__mapped.record(offset)[0]
+            self.__add(classes[record["__class__"]](**record))
+
+    def __shadow(self, key):
+        """records that key, if the mapped snapshot holds it, no longer
+        reads from the snapshot"""
+        shadowed = self.__shadowed.setdefault(key.split(".")[0], set())
+        if key not in shadowed and self.__mapped.find(key) is not None:
+            shadowed.add(key)
+
+    def __unindex(self, key):
+        """removes key from the foreign key indexes"""
+        for entry in self.__indexed.pop(key, ()):
+            objs = self.__children.get(entry)
+            if objs is not None:
+                objs.pop(key, None)
+                if len(objs) == 0:
+                    del self.__children[entry]
+
+    def __index(self, key, obj):
+        """(re)indexes obj under the current values of its foreign keys"""
+        self.__unindex(key)
+        name = obj.__class__.__name__
+        entries = []
+        for fk in foreign_keys.get(name, ()):
+            entry = (name, fk, getattr(obj, fk, None))
+            self.__children.setdefault(entry, {})[key] = obj
+            entries.append(entry)
+        if entries:
+            self.__indexed[key] = entries
+
+    def changed(self, obj, name):
+        """called when the attribute name of obj is set: if obj is stored,
+        marks it for the next save and, for a foreign key, moves it in
+        the index of that key"""
+        with self.__lock:
+            cls = obj.__class__.__name__
+            key = cls + "." + str(getattr(obj, "id", None))
+            if self.__objects.get(key) is not obj:
+                return
+            self.__dirty[key] = obj
+            if name in foreign_keys.get(cls, ()):
+                self.__index(key, obj)
+
+    def __add(self, obj):
+        """sets obj in __objects and its indexes, returns its key"""
+        key = obj.__class__.__name__ + "." + obj.id
+        self.__objects[key] = obj
+        self.__classes.setdefault(obj.__class__.__name__, {})[key] = obj
+        self.__index(key, obj)
+        self.__raw.get(obj.__class__.__name__, {}).pop(key, None)
+        if self.__mapped is not None:
+            self.__shadow(key)
+        return key
+
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
-        if obj is not None:
-            key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+        with self.__lock:
+            if obj is not None:
+                self.__dirty[self.__add(obj)] = obj
+
+    def __stat(self, path=None):
+        """returns the (mtime, size) of the JSON file and of its journal,
+        or of the file at path"""
+        stamp = ()
+        paths = (self.__file_path, self.__file_path + ".journal")
+        if path is not None:
+            paths = (path,)
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stamp += (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamp += (None, None)
+        return stamp
+
+    def __mark_loaded(self, loaded, stamp):
+        """remembers the updated_at of each key the JSON file holds at
+        stamp"""
+        self.__loaded.clear()
+        self.__loaded.update(loaded)
+        FileStorage.__stamp = stamp
+
+    def __record(self, obj):
+        """returns the record of obj and its formatted updated_at
+        this is to_dict(save_fs=1), with the datetimes left unformatted"""
+        record = obj._fields()
+        record["__class__"] = obj.__class__.__name__
+        return record, self.__updated_at(record)
+
+    def __updated_at(self, record):
+        """returns the updated_at of record formatted as in file.json"""
+        updated_at = record.get("updated_at")
+        if isinstance(updated_at, datetime):
+            return codec.timestamp(updated_at)
+        return updated_at
+
+    def __serialize(self, key, obj):
+        """serializes obj and caches its JSON"""
+        record, updated_at = self.__record(obj)
+        self.__records[key] = (obj, updated_at, codec.dumps(record))
+
+    @contextmanager
+    def batch(self):
+        """defers the saves issued by the current thread within the block
+        to a single save when the outermost block exits"""
+        self.__batch.depth = getattr(self.__batch, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            self.__batch.depth -= 1
+            if self.__batch.depth == 0 and \
+                    getattr(self.__batch, "deferred", False):
+                self.__batch.deferred = False
+                self.save()
+
+    def flush(self):
+        """writes the changes left pending by the background flusher"""
+        with self.__commit:
+            if self.__pending:
+                FileStorage.__pending = False
+                try:
+                    with self.__lock:
+                        self.__save()
+                except BaseException:
+                    FileStorage.__pending = True
+                    raise
+
+    def __flush_loop(self):
+        """body of the background flusher thread, until the flush is
+        turned off; a failed write is logged and retried on the next
+        tick rather than ending the thread"""
+        while self.__flush_ms > 0:
+            time.sleep(self.__flush_ms / 1000)
+            try:
+                self.flush()
+            except Exception:
+                logging.getLogger(__name__).exception(
+                    "background flush of %s failed", self.__file_path)
+        with self.__commit:
+            FileStorage.__flusher = None
 
     def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
-
-    def reload(self):
-        """deserializes the JSON file to __objects"""
+        """serializes __objects to the JSON file (path: __file_path)
+        inside batch() the save is deferred to the end of the block; with
+        a background flusher it is left to the flusher thread; with a
+        group commit window, the first save waits __commit_ms then
+        writes on behalf of every save issued meanwhile, and each of them
+        returns once that write is durable"""
+        if getattr(self.__batch, "depth", 0) > 0:
+            self.__batch.deferred = True
+            return
+        if self.__flush_ms > 0:
+            with self.__commit:
+                FileStorage.__pending = True
+                if self.__flusher is None:
+                    FileStorage.__flusher = threading.Thread(
+                        target=self.__flush_loop, daemon=True)
+                    self.__flusher.start()
+                    atexit.register(self.flush)
+            return
+        if self.__commit_ms <= 0:
+            with self.__lock:
+                self.__save()
+            return
+        with self.__commit:
+            FileStorage.__requested += 1
+            ticket = FileStorage.__requested
+            while self.__durable < ticket and self.__leading:
+                self.__commit.wait()
+            if self.__durable >= ticket:
+                return
+            FileStorage.__leading = True
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except:
+            time.sleep(self.__commit_ms / 1000)
+            with self.__commit:
+                requested = self.__requested
+                with self.__lock:
+                    self.__save()
+                FileStorage.__durable = requested
+        finally:
+            with self.__commit:
+                FileStorage.__leading = False
+                self.__commit.notify_all()
+
+    def __save(self):
+        """writes the changes to disk
+        in journal mode, only the objects added or deleted since the last
+        save are appended to the journal, and the journal is compacted
+        into the JSON file once it holds __journal entries; since the
+        journal then already holds every change, replaying it over the
+        new file after a crash is harmless
+        in sharded mode, only the shards holding those objects are
+        rewritten"""
+        if self.__shards:
+            self.__write_shards()
+            return
+        if self.__journal and os.path.exists(self.__file_path):
+            self.__append_journal()
+            if self.__journal_len < self.__journal:
+                return
+        self.__write_file()
+
+    def __write_file(self):
+        """writes every object to the file and empties the journal"""
+        loaded = {}
+        raw = ((key, record) for cls in self.__raw
+               for key, record in self.__raw[cls].items())
+        if self.__mmap:
+            self.__write_atomic(snapshot.dumps(
+                self.__items(raw, self.__objects.items(), loaded)))
+            with open(self.__file_path, 'rb') as f:
+                self.__map(f)
+            for key in self.__objects:
+                self.__shadowed.setdefault(key.split(".")[0], set()).add(key)
+        elif self.__format == "binary":
+            self.__write_atomic(snapshot.dumps(
+                self.__items(raw, self.__objects.items(), loaded)))
+        else:
+            for key in list(self.__records):
+                if key not in self.__objects:
+                    del self.__records[key]
+            self.__write_atomic(self.__json(
+                raw, self.__objects.items(), loaded))
+        if os.path.exists(self.__file_path + ".journal"):
+            os.remove(self.__file_path + ".journal")
+        FileStorage.__journal_len = 0
+        self.__dirty.clear()
+        self.__mark_loaded(loaded, self.__stat())
+
+    def __items(self, raw, objects, loaded):
+        """yields the (key, record) pairs of the raw records and of the
+        objects, then those of the mapped records not shadowed"""
+        for key, record in raw:
+            if type(record) is bytes:
+                record = codec.loads(record)
+            loaded[key] = None
+            yield key, record
+        if self.__mapped is not None:
+            for key, record in self.__mapped:
+                if key not in self.__shadowed.get(key.split(".")[0], ()):
+                    loaded[key] = None
+                    yield key, record
+        for key, obj in objects:
+            record, loaded[key] = self.__record(obj)
+            yield key, record
+
+    def __json(self, raw, objects, loaded):
+        """returns the content of a JSON file holding the raw records and
+        the objects, one per line
+        only the objects added since the last save (or never serialized)
+        go through to_dict, the others reuse their cached JSON"""
+        lines = []
+        for key, record in raw:
+            if type(record) is not bytes:
+                record = codec.dumps(record).encode()
+            lines.append(codec.dumps(key) + ": " + record.decode())
+            loaded[key] = None
+        for key, obj in objects:
+            cached = self.__records.get(key)
+            if cached is None or cached[0] is not obj or key in self.__dirty:
+                self.__serialize(key, obj)
+                cached = self.__records[key]
+            lines.append(codec.dumps(key) + ": " + cached[2])
+            loaded[key] = cached[1]
+        return "{\n" + ",\n".join(lines) + "\n}"
+
+    def __shard(self, key):
+        """returns the path of the shard file of key"""
+        cls, id = key.split(".", 1)
+        root, ext = os.path.splitext(self.__file_path)
+        if self.__shards == 1:
+            return "{}.{}{}".format(root, cls, ext)
+        return "{}.{}.{}{}".format(root, cls,
+                                   zlib.crc32(id.encode()) % self.__shards,
+                                   ext)
+
+    def __shard_paths(self, cls):
+        """returns the paths of the shard files of class cls"""
+        root, ext = os.path.splitext(self.__file_path)
+        if self.__shards == 1:
+            return ["{}.{}{}".format(root, cls, ext)]
+        return ["{}.{}.{}{}".format(root, cls, n, ext)
+                for n in range(self.__shards)]
+
+    def __require(self, cls):
+        """in sharded mode, loads the shards of class cls on first use"""
+        with self.__lock:
+            if self.__shards:
+                for path in self.__shard_paths(cls):
+                    if path not in self.__shard_stamps:
+                        self.__read_shard(path)
+
+    def __write_shards(self):
+        """rewrites the shard files holding the objects added or deleted
+        since the last save, with the whole content of those shards"""
+        shards = {}
+        for key, obj in self.__dirty.items():
+            if obj is None:
+                self.__records.pop(key, None)
+            shards.setdefault(self.__shard(key), key.split(".")[0])
+        for path, cls in shards.items():
+            self.__require(cls)
+            raw = [(key, record)
+                   for key, record in self.__raw.get(cls, {}).items()
+                   if self.__shard(key) == path]
+            objects = [(key, obj)
+                       for key, obj in self.__classes.get(cls, {}).items()
+                       if self.__shard(key) == path]
+            loaded = {}
+            if self.__format == "binary":
+                self.__write_atomic(snapshot.dumps(
+                    self.__items(raw, objects, loaded)), path)
+            else:
+                self.__write_atomic(self.__json(raw, objects, loaded), path)
+            self.__mark_shard(path, loaded, self.__stat(path))
+        self.__dirty.clear()
+
+    def __mark_shard(self, path, loaded, stamp):
+        """remembers the updated_at of each key the shard file at path
+        holds at stamp"""
+        for key in self.__shard_keys.pop(path, ()):
+            self.__loaded.pop(key, None)
+        self.__loaded.update(loaded)
+        self.__shard_keys[path] = set(loaded)
+        self.__shard_stamps[path] = stamp
+
+    def __read_shard(self, path):
+        """loads the shard file at path like reload() loads the single
+        file: unchanged records are kept, removed ones are discarded and
+        the objects changed since the last save are left as they are"""
+        stamp = self.__stat(path)
+        loaded = {}
+        try:
+            with open(path, 'rb') as f:
+                if snapshot.is_snapshot(f.read(len(snapshot.MAGIC))):
+                    f.seek(0)
+                    records = snapshot.Snapshot(f.read())
+                else:
+                    f.seek(0)
+                    records = self.__read_file(f)
+                for key, record in records:
+                    if key in self.__dirty:
+                        loaded[key] = None
+                    else:
+                        self.__load(key, record, loaded)
+        except FileNotFoundError:
             pass
+        for key in self.__shard_keys.get(path, ()):
+            if key not in loaded:
+                self.__discard(key)
+        self.__mark_shard(path, loaded, stamp)
+
+    def __write_atomic(self, data, path=None):
+        """replaces the JSON file (or the file at path) by data: it is
+        written to a temporary file, synced, then renamed over the JSON
+        file so that a crash leaves either the old or the new file, never
+        a truncated one"""
+        if path is None:
+            path = self.__file_path
+        # the temporary file is proper to the process and thread, so that
+        # concurrent writers never share (or rename away) each other's
+        tmp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp, 'wb' if type(data) is bytes else 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        fd = os.open(os.path.dirname(os.path.abspath(path)),
+                     os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __append_journal(self):
+        """appends the objects added or deleted since the last save to
+        the journal, one JSON entry per line"""
+        if len(self.__dirty) == 0:
+            return
+        lines = []
+        for key, obj in self.__dirty.items():
+            record = "null"
+            self.__loaded.pop(key, None)
+            if obj is not None:
+                self.__serialize(key, obj)
+                self.__loaded[key] = self.__records[key][1]
+                record = self.__records[key][2]
+            lines.append('{"key": ' + codec.dumps(key) +
+                         ', "record": ' + record + '}\n')
+        with open(self.__file_path + ".journal", 'a+b') as f:
+            # a torn line left by a crash must not swallow the entries
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines.insert(0, "\n")
+            f.write("".join(lines).encode())
+            f.flush()
+            os.fsync(f.fileno())
+        FileStorage.__journal_len += len(lines)
+        self.__dirty.clear()
+        FileStorage.__stamp = self.__stat()
+
+    def __read_journal(self, records):
+        """reads the journal entries into records (None for a deletion),
+        returns their number and whether the journal was truncated
+        a line that does not parse, torn by a crash during an append, is
+        skipped; the journal is truncated after its last valid entry so
+        that the next append starts on a line of its own"""
+        count = 0
+        path = self.__file_path + ".journal"
+        end = 0
+        try:
+            with open(path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    offset += len(line)
+                    try:
+                        entry = codec.loads(line)
+                        records[entry["key"]] = entry["record"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    count += 1
+                    end = offset
+                size = f.tell()
+        except FileNotFoundError:
+            return 0, False
+        if end < size:
+            os.truncate(path, end)
+        return count, end < size
+
+    def __read_file(self, f, progress=None):
+        """yields the (key, record) pairs of the JSON file one at a time
+        save() writes one record per line between a "{" and a "}" line:
+        those records are yielded as raw JSON bytes and only a line is
+        held in memory at once; files laid out otherwise are parsed as a
+        whole and their records are yielded as dictionaries
+        progress, if given, is called every 10000 records and at the end
+        with the number of records, the bytes read and the file size"""
+        size = os.fstat(f.fileno()).st_size
+        done = len(f.readline())
+        count = 0
+        try:
+            if done != 2 or size < 4:
+                raise ValueError("not one record per line")
+            for line in f:
+                done += len(line)
+                line = line.rstrip()
+                if line.endswith(b","):
+                    line = line[:-1]
+                if line == b"}" or len(line) == 0:
+                    continue
+                split = self.__key_end(line)
+                if line[split:split + 4] != b'": {' or \
+                        not line.endswith(b"}"):
+                    raise ValueError("not one record per line")
+                key = line[1:split]
+                # a key holding escapes (quotes, backslashes, non-ASCII
+                # characters encoded by json) is decoded as JSON
+                key = codec.loads(line[:split + 1]) if b"\\" in key \
+                    else key.decode()
+                yield key, line[split + 3:]
+                count += 1
+                if progress is not None and count % 10000 == 0:
+                    progress(count, done, size)
+        except ValueError:
+            f.seek(0)
+            count = 0
+            for item in codec.loads(f.read()).items():
+                yield item
+                count += 1
+            done = size
+        if progress is not None:
+            progress(count, done, size)
+
+    def __key_end(self, line):
+        """returns the position of the quote closing the JSON string that
+        starts line, escaped quotes being skipped; raises ValueError if
+        line does not start with a string"""
+        if not line.startswith(b'"'):
+            raise ValueError("not one record per line")
+        end = line.index(b'"', 1)
+        while True:
+            escapes = end
+            while line[escapes - 1] == ord("\\"):
+                escapes -= 1
+            if (end - escapes) % 2 == 0:
+                return end
+            end = line.index(b'"', end + 1)
+
+    def __load(self, key, record, loaded):
+        """instantiates record unless key already holds it unchanged
+        in lazy mode, the records of keys not instantiated yet are kept
+        raw instead"""
+        if self.__lazy and self.__mapped is None and \
+                key not in self.__objects:
+            self.__raw.setdefault(key.split(".")[0], {})[key] = record
+            loaded[key] = None
+            return
+        if type(record) is bytes:
+            record = codec.loads(record)
+        updated_at = self.__updated_at(record)
+        loaded[key] = updated_at
+        if key in self.__objects and self.__loaded.get(key) == updated_at:
+            return
+        self.__add(classes[record["__class__"]](**record))
+
+    def __discard(self, key):
+        """forgets key, whether it is instantiated or still raw"""
+        if key in self.__objects:
+            self.__remove(self.__objects[key])
+        else:
+            self.__raw.get(key.split(".")[0], {}).pop(key, None)
+            if self.__mapped is not None:
+                self.__shadow(key)
+
+    def __map(self, f):
+        """maps the snapshot file f read-only in place of the current
+        mapping, with nothing shadowed"""
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__mapped is not None:
+            self.__mapped.close()
+        FileStorage.__mapped = snapshot.Snapshot(mapping)
+        self.__shadowed.clear()
+
+    def __unmap(self):
+        """forgets the mapped snapshot and every object read from the
+        file, only the changes not saved yet are kept"""
+        for key, obj in list(self.__objects.items()):
+            if key not in self.__dirty:
+                self.__remove(obj)
+        self.__raw.clear()
+        self.__loaded.clear()
+        self.__shadowed.clear()
+        if self.__mapped is not None:
+            self.__mapped.close()
+            FileStorage.__mapped = None
+
+    def reload(self, progress=None):
+        """deserializes the JSON file to __objects
+        records are read and instantiated one at a time; records whose
+        updated_at did not change since the last load or save are kept
+        as they are, records removed from the file are removed from
+        __objects; the journal is replayed over the file
+        in mapped mode a snapshot is mapped rather than read, and the
+        objects read from the previous file are dropped so that they are
+        decoded afresh from the new one
+        a missing file means an empty storage, but an unreadable one is
+        an error rather than a reason to start empty
+        in sharded mode, only the changed shards of the classes already
+        loaded are read again, the others are read on first use"""
+        with self.__lock:
+            if self.__shards:
+                for path, stamp in list(self.__shard_stamps.items()):
+                    if self.__stat(path) != stamp:
+                        self.__read_shard(path)
+                return
+            stamp = self.__stat()
+            try:
+                f = open(self.__file_path, 'rb')
+            except FileNotFoundError:
+                return
+            loaded = {}
+            with f:
+                head = f.read(len(snapshot.MAGIC))
+                if self.__mapped is not None or \
+                        (self.__mmap and snapshot.is_snapshot(head)):
+                    self.__unmap()
+                if self.__mmap and snapshot.is_snapshot(head):
+                    self.__map(f)
+                    for key in self.__dirty:
+                        self.__shadow(key)
+                    if progress is not None:
+                        size = os.fstat(f.fileno()).st_size
+                        progress(len(self.__mapped), size, size)
+                elif snapshot.is_snapshot(head):
+                    f.seek(0)
+                    records = snapshot.Snapshot(f.read())
+                    for key, record in records:
+                        self.__load(key, record, loaded)
+                    if progress is not None:
+                        progress(len(records), f.tell(), f.tell())
+                else:
+                    f.seek(0)
+                    for key, record in self.__read_file(f, progress):
+                        self.__load(key, record, loaded)
+            journal = {}
+            FileStorage.__journal_len, truncated = \
+                self.__read_journal(journal)
+            if truncated:
+                stamp = stamp[:2] + self.__stat(self.__file_path + ".journal")
+            for key, record in journal.items():
+                if record is not None:
+                    self.__load(key, record, loaded)
+                elif key in loaded or self.__mapped is not None:
+                    loaded.pop(key, None)
+                    self.__discard(key)
+            for key in self.__loaded:
+                if key not in loaded:
+                    self.__discard(key)
+            self.__mark_loaded(loaded, stamp)
+
+    def __remove(self, obj):
+        """removes obj from __objects and its indexes, returns its key"""
+        key = obj.__class__.__name__ + '.' + obj.id
+        if key in self.__objects:
+            del self.__objects[key]
+        self.__classes.get(obj.__class__.__name__, {}).pop(key, None)
+        self.__unindex(key)
+        if self.__mapped is not None:
+            self.__shadow(key)
+        return key
 
     def delete(self, obj=None):
         """ delete obj from __objects if its inside """
-        if obj is not None:
-            key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+        with self.__lock:
+            if obj is not None:
+                self.__dirty[self.__remove(obj)] = None
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
-        self.reload()
+        """call reload() method for deserializing the JSON file to objects
+        unless the file is unchanged since the last load or save"""
+        if self.__stamp is None or self.__stat() != self.__stamp:
+            self.reload()
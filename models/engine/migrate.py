@@ -0,0 +1,33 @@
+#!/usr/bin/python3
+"""
+Adds the indexes the models declare to an existing database
+usage: HBNB_TYPE_STORAGE=db HBNB_MYSQL_USER=hbnb_dev HBNB_MYSQL_PWD=...
+       HBNB_MYSQL_HOST=localhost HBNB_MYSQL_DB=hbnb_dev_db
+       python3 -m models.engine.migrate [--dry-run]
+the tables are left as they are otherwise, and running it again once the
+indexes exist does nothing
+"""
+
+import models
+import sys
+
+
+def main(argv):
+    """adds the missing indexes, or lists them with --dry-run"""
+    if argv not in ([], ["--dry-run"]):
+        print("usage: python3 -m models.engine.migrate [--dry-run]")
+        return 1
+    if models.storage_t != "db":
+        print("HBNB_TYPE_STORAGE must be db")
+        return 1
+    dry_run = argv == ["--dry-run"]
+    names = models.storage.add_indexes(dry_run=dry_run)
+    for name in names:
+        print("{} {}".format("missing" if dry_run else "created", name))
+    if len(names) == 0:
+        print("no missing index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+Contains the Query class returned by storage.query(cls)
+usage: storage.query(Place).filter(city_id=city.id, price_by_night__lt=100)
+                           .order_by("name").limit(20)
+a criterion is <attribute>=<value> or <attribute>__<operator>=<value>, the
+operators being those of Query.operators; order_by takes attribute names,
+prefixed with "-" for a descending order
+"""
+
+import heapq
+from itertools import islice
+import operator
+
+
+class Query:
+    """a query on the objects of a class, built step by step (each step
+    returns a new Query) and run by the storage only when iterated"""
+
+    operators = {"eq": operator.eq, "ne": operator.ne, "lt": operator.lt,
+                 "le": operator.le, "gt": operator.gt, "ge": operator.ge,
+                 "in": lambda value, values: value in values}
+
+    def __init__(self, run, cls):
+        """initializes a query on the objects of cls, run(query) returns
+        an iterable of the objects matching the query"""
+        self.__run = run
+        self.cls = cls
+        # list of (attribute, operator, value)
+        self.criteria = []
+        # list of (attribute, descending)
+        self.order = []
+        # maximum number of objects, None for no limit
+        self.size = None
+
+    def __copy(self):
+        """returns a copy of the query, to be refined"""
+        query = Query(self.__run, self.cls)
+        query.criteria = list(self.criteria)
+        query.order = list(self.order)
+        query.size = self.size
+        return query
+
+    def filter(self, **criteria):
+        """returns the query restricted to the objects matching criteria"""
+        query = self.__copy()
+        for key, value in criteria.items():
+            name, _, op = key.partition("__")
+            op = op or "eq"
+            if op not in self.operators:
+                raise ValueError("unknown operator: {}".format(op))
+            query.criteria.append((name, op, value))
+        return query
+
+    def order_by(self, *names):
+        """returns the query ordered by the attributes names"""
+        query = self.__copy()
+        for name in names:
+            query.order.append((name.lstrip("-"), name.startswith("-")))
+        return query
+
+    def limit(self, count):
+        """returns the query limited to the first count objects"""
+        query = self.__copy()
+        query.size = count
+        return query
+
+    def __iter__(self):
+        """runs the query, yields the matching objects"""
+        return iter(self.__run(self))
+
+    def match(self, obj):
+        """tells whether obj matches every criterion"""
+        for name, op, value in self.criteria:
+            try:
+                if not self.operators[op](getattr(obj, name, None), value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def apply(self, objs):
+        """runs the query over objs in Python: yields those that match,
+        ordered and limited, for the storages without a query engine"""
+        objs = (obj for obj in objs if self.match(obj))
+        if not self.order:
+            return islice(objs, self.size)
+
+        def key(name):
+            # None is ordered first, like NULL
+            return lambda obj: (getattr(obj, name, None) is not None,
+                                getattr(obj, name, None))
+        if self.size is not None and len(self.order) == 1:
+            name, descending = self.order[0]
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            return iter(pick(self.size, objs, key(name)))
+        objs = list(objs)
+        for name, descending in reversed(self.order):
+            objs.sort(key=key(name), reverse=descending)
+        return islice(objs, self.size)
@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+"""
+Contains the compact binary snapshot format of the file storage
+usage: python3 -m models.engine.snapshot <source> <destination>
+converts a file.json to a binary snapshot, or a binary snapshot back to
+a file.json, depending on what <source> holds
+
+layout (little endian):
+    header   magic, number of strings, number of records and the offsets
+             of the three sections below
+    strings  the end offset of each string, then the UTF-8 string blob
+    records  per record: class number, bitmap of the schema fields that
+             follow, the fields themselves (uuids as 16 bytes, datetimes
+             as microseconds since the epoch, strings as string numbers,
+             integers, floats), then the string number of a JSON object
+             holding the attributes outside the schema (or NONE)
+    index    the offsets of the records, sorted by their key
+             "<class name>.<id>"
+"""
+
+from datetime import datetime, timedelta
+from models.engine import codec
+import struct
+import uuid
+
+MAGIC = b"HBNBSNP1"
+NONE = 0xffffffff
+HEADER = struct.Struct("<8sIIQQQ")
+RECORD = struct.Struct("<BI")
+STRING = struct.Struct("<I")
+END = struct.Struct("<Q")
+ENTRY = struct.Struct("<Q")
+EPOCH = datetime(1970, 1, 1)
+formats = {"int": struct.Struct("<q"), "float": struct.Struct("<d"),
+           "time": struct.Struct("<q")}
+
+# attributes shared by every class, then the columns of each class
+common = (("id", "uuid"), ("created_at", "time"), ("updated_at", "time"))
+schemas = {
+    "Amenity": (("name", "str"),),
+    "BaseModel": (),
+    "City": (("state_id", "uuid"), ("name", "str")),
+    "Place": (("city_id", "uuid"), ("user_id", "uuid"), ("name", "str"),
+              ("description", "str"), ("number_rooms", "int"),
+              ("number_bathrooms", "int"), ("max_guest", "int"),
+              ("price_by_night", "int"), ("latitude", "float"),
+              ("longitude", "float")),
+    "Review": (("place_id", "uuid"), ("user_id", "uuid"), ("text", "str")),
+    "State": (("name", "str"),),
+    "User": (("email", "str"), ("password", "str"), ("first_name", "str"),
+             ("last_name", "str")),
+}
+class_names = sorted(schemas)
+
+
+def is_snapshot(head):
+    """tells whether head, the first bytes of a file, is a snapshot"""
+    return head[:len(MAGIC)] == MAGIC
+
+
+def _pack(kind, value, strings):
+    """returns value packed as kind, None if it does not fit kind"""
+    if kind == "str":
+        if type(value) is not str:
+            return None
+        return STRING.pack(strings.setdefault(value, len(strings)))
+    if kind == "uuid":
+        if type(value) is not str:
+            return None
+        try:
+            packed = uuid.UUID(value)
+        except ValueError:
+            return None
+        return packed.bytes if str(packed) == value else None
+    if kind == "time":
+        if type(value) is str:
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+            if parsed.tzinfo is not None or \
+                    codec.timestamp(parsed) != value:
+                return None
+            value = parsed
+        if type(value) is not datetime or value.tzinfo is not None:
+            return None
+        value = (value - EPOCH) // timedelta(microseconds=1)
+    elif type(value) is not {"int": int, "float": float}[kind]:
+        return None
+    try:
+        return formats[kind].pack(value)
+    except struct.error:
+        return None
+
+
+def dumps(records):
+    """returns the snapshot of records, an iterable of (key, record)
+    where record is a dictionary like the ones of file.json, datetimes
+    being either datetime objects or formatted strings"""
+    strings = {}
+    body = []
+    index = []
+    offset = 0
+    for key, record in records:
+        cls = record["__class__"]
+        fields = common + schemas.get(cls, ())
+        bits = 0
+        parts = []
+        extras = {}
+        for i, (name, kind) in enumerate(fields):
+            if name not in record:
+                continue
+            packed = _pack(kind, record[name], strings)
+            if packed is None:
+                extras[name] = record[name]
+            else:
+                bits |= 1 << i
+                parts.append(packed)
+        names = [name for name, kind in fields]
+        for name, value in record.items():
+            if name not in names and name != "__class__":
+                extras[name] = value
+        if cls not in schemas:
+            extras["__class__"] = cls
+            cls = "BaseModel"
+        extra = NONE
+        if extras:
+            extra = strings.setdefault(codec.dumps(extras), len(strings))
+        data = RECORD.pack(class_names.index(cls), bits) + b"".join(parts) \
+            + STRING.pack(extra)
+        index.append((key, offset))
+        body.append(data)
+        offset += len(data)
+    blob = []
+    ends = []
+    end = 0
+    for string in strings:
+        encoded = string.encode()
+        blob.append(encoded)
+        end += len(encoded)
+        ends.append(END.pack(end))
+    index.sort()
+    strings_offset = HEADER.size
+    records_offset = strings_offset + END.size * len(strings) + end
+    index_offset = records_offset + offset
+    return b"".join([HEADER.pack(MAGIC, len(strings), len(index),
+                                 strings_offset, records_offset,
+                                 index_offset)] + ends + blob + body +
+                    [ENTRY.pack(offset + records_offset)
+                     for key, offset in index])
+
+
+class Snapshot:
+    """reads the records of a snapshot held in a buffer (bytes, mmap)"""
+
+    def __init__(self, buf):
+        """parses the header of the snapshot held in buf"""
+        (magic, self.__n_strings, self.__n_records, self.__strings,
+         self.__records, self.__index) = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError("not a snapshot")
+        self.__buf = buf
+        self.__blob = self.__strings + END.size * self.__n_strings
+
+    def __len__(self):
+        """returns the number of records"""
+        return self.__n_records
+
+    def string(self, i):
+        """returns the string number i"""
+        start = 0
+        if i > 0:
+            start = END.unpack_from(self.__buf,
+                                    self.__strings + END.size * (i - 1))[0]
+        end = END.unpack_from(self.__buf, self.__strings + END.size * i)[0]
+        return bytes(self.__buf[self.__blob + start:
+                                self.__blob + end]).decode()
+
+    def record(self, offset):
+        """returns the record at offset and the offset of the next one
+        datetimes are returned as datetime objects"""
+        buf = self.__buf
+        number, bits = RECORD.unpack_from(buf, offset)
+        offset += RECORD.size
+        cls = class_names[number]
+        record = {}
+        for i, (name, kind) in enumerate(common + schemas[cls]):
+            if not bits & 1 << i:
+                continue
+            if kind == "uuid":
+                record[name] = str(uuid.UUID(bytes=bytes(
+                    buf[offset:offset + 16])))
+                offset += 16
+            elif kind == "str":
+                record[name] = self.string(STRING.unpack_from(buf,
+                                                              offset)[0])
+                offset += STRING.size
+            else:
+                value = formats[kind].unpack_from(buf, offset)[0]
+                offset += formats[kind].size
+                if kind == "time":
+                    value = EPOCH + timedelta(microseconds=value)
+                record[name] = value
+        record["__class__"] = cls
+        extra = STRING.unpack_from(buf, offset)[0]
+        if extra != NONE:
+            record.update(codec.loads(self.string(extra)))
+        return record, offset + STRING.size
+
+    def __iter__(self):
+        """yields the (key, record) pairs in the order they were dumped"""
+        offset = self.__records
+        while offset < self.__index:
+            record, offset = self.record(offset)
+            yield record["__class__"] + "." + record["id"], record
+
+    def key(self, offset):
+        """returns the key of the record at offset"""
+        number, bits = RECORD.unpack_from(self.__buf, offset)
+        if bits & 1 and class_names[number] != "BaseModel":
+            start = offset + RECORD.size
+            return class_names[number] + "." + str(uuid.UUID(bytes=bytes(
+                self.__buf[start:start + 16])))
+        record = self.record(offset)[0]
+        return record["__class__"] + "." + record["id"]
+
+    def __offset(self, i):
+        """returns the offset of the record number i of the index"""
+        return ENTRY.unpack_from(self.__buf, self.__index + ENTRY.size * i)[0]
+
+    def __bisect(self, key):
+        """returns the position in the index of the first key >= key"""
+        low = 0
+        high = self.__n_records
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(self.__offset(middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __range(self, cls):
+        """returns the positions in the index of the keys of class cls"""
+        return range(self.__bisect(cls + "."), self.__bisect(cls + "/"))
+
+    def keys(self):
+        """yields the keys in sorted order"""
+        for i in range(self.__n_records):
+            yield self.key(self.__offset(i))
+
+    def find(self, key):
+        """returns the offset of the record of key, None if absent
+        the index is binary searched, so only a few records are read"""
+        i = self.__bisect(key)
+        if i < self.__n_records:
+            offset = self.__offset(i)
+            if self.key(offset) == key:
+                return offset
+        return None
+
+    def offsets(self, cls):
+        """returns the offsets of the records of class cls, by key"""
+        return [self.__offset(i) for i in self.__range(cls)]
+
+    def count(self, cls):
+        """returns the number of records of class cls"""
+        return len(self.__range(cls))
+
+    def close(self):
+        """closes the buffer, if it is a mapping"""
+        if hasattr(self.__buf, "close"):
+            self.__buf.close()
+
+    def __getitem__(self, key):
+        """returns the record of key"""
+        offset = self.find(key)
+        if offset is None:
+            raise KeyError(key)
+        return self.record(offset)[0]
+
+
+def convert(source, destination):
+    """converts source, a file.json or a snapshot, to the other format"""
+    with open(source, 'rb') as f:
+        data = f.read()
+    if is_snapshot(data):
+        lines = [codec.dumps(key) + ": " + codec.dumps(record)
+                 for key, record in Snapshot(data)]
+        data = ("{\n" + ",\n".join(lines) + "\n}").encode()
+    else:
+        data = dumps(codec.loads(data).items())
+    with open(destination, 'wb') as f:
+        f.write(data)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("usage: python3 -m models.engine.snapshot "
+              "<source> <destination>")
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
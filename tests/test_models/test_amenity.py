@@ -101,5 +101,5 @@ class TestAmenity(unittest.TestCase):
     def test_str(self):
         """test that the str method has the correct output"""
         amenity = Amenity()
-        string = "[Amenity] ({}) {}".format(amenity.id, amenity.__dict__)
+        string = "[Amenity] ({}) {}".format(amenity.id, amenity._fields())
         self.assertEqual(string, str(amenity))
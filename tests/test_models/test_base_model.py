@@ -2,6 +2,7 @@
 """Test BaseModel for expected behavior and documentation"""
 from datetime import datetime
 import inspect
+import json
 import models
 import pep8 as pycodestyle
 import time
@@ -71,10 +72,13 @@ class TestBaseModel(unittest.TestCase):
             "name": str,
             "number": int
         }
+        # _fields() holds the attributes set, whether the instance keeps
+        # them in its __dict__ or in the slots of a compact model
+        fields = inst._fields()
         for attr, typ in attrs_types.items():
             with self.subTest(attr=attr, typ=typ):
-                self.assertIn(attr, inst.__dict__)
-                self.assertIs(type(inst.__dict__[attr]), typ)
+                self.assertIn(attr, fields)
+                self.assertIs(type(fields[attr]), typ)
         self.assertEqual(inst.name, "Holberton")
         self.assertEqual(inst.number, 89)
 
@@ -141,7 +145,7 @@ class TestBaseModel(unittest.TestCase):
     def test_str(self):
         """test that the str method has the correct output"""
         inst = BaseModel()
-        string = "[BaseModel] ({}) {}".format(inst.id, inst.__dict__)
+        string = "[BaseModel] ({}) {}".format(inst.id, inst._fields())
         self.assertEqual(string, str(inst))
 
     @mock.patch('models.storage')
@@ -158,3 +162,42 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(old_created_at, new_created_at)
         self.assertTrue(mock_storage.new.called)
         self.assertTrue(mock_storage.save.called)
+
+    def test_to_dict_cached(self):
+        """Test that the public representation is cached until an
+        attribute is set"""
+        inst = BaseModel()
+        inst.name = "Holberton"
+        first = inst.to_dict()
+        first["name"] = "changed"
+        self.assertEqual(inst.to_dict()["name"], "Holberton")
+        self.assertEqual(json.loads(inst.to_json()), inst.to_dict())
+        inst.name = "Betty"
+        self.assertEqual(inst.to_dict()["name"], "Betty")
+        self.assertEqual(json.loads(inst.to_json())["name"], "Betty")
+        del inst.name
+        self.assertNotIn("name", inst.to_dict())
+        self.assertIn("password", BaseModel(password="pw").to_dict(1))
+
+    def test_foreign_keys_interned(self):
+        """Test that the foreign keys given as kwargs are interned"""
+        first = BaseModel(place_id="".join(["place", "-1"]))
+        second = BaseModel(place_id="".join(["place", "-1"]))
+        self.assertIs(first.place_id, second.place_id)
+
+    @unittest.skipIf(not models.compact, "not testing compact models")
+    def test_compact(self):
+        """Test that compact models keep their columns in slots"""
+        from models.place import Place
+        place = Place(name="Cabin", city_id="".join(["city", "-1"]))
+        other = Place(city_id="".join(["city", "-1"]))
+        self.assertIs(place.city_id, other.city_id)
+        self.assertEqual(other.name, "")
+        self.assertIs(type(place._created_at), int)
+        self.assertIs(type(place.created_at), datetime)
+        self.assertIsNone(place.__getstate__()[0])
+        self.assertNotIn("name", other.to_dict())
+        place.extra = 1
+        copy = Place(**place.to_dict())
+        self.assertEqual(copy.to_dict(), place.to_dict())
+        self.assertEqual(copy.created_at, place.created_at)
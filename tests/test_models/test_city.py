@@ -110,5 +110,5 @@ class TestCity(unittest.TestCase):
     def test_str(self):
         """test that the str method has the correct output"""
         city = City()
-        string = "[City] ({}) {}".format(city.id, city.__dict__)
+        string = "[City] ({}) {}".format(city.id, city._fields())
         self.assertEqual(string, str(city))
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+"""
+Contains the TestCodec classes
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+import json
+from models.engine import codec
+import pep8
+import unittest
+
+
+class TestCodecDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the codec module"""
+
+    def test_pep8_conformance_codec(self):
+        """Test that models/engine/codec.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/codec.py',
+                                    'tests/test_models/test_engine/\
+test_codec.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_codec_module_docstring(self):
+        """Test for the codec.py module docstring"""
+        self.assertIsNot(codec.__doc__, None,
+                         "codec.py needs a docstring")
+
+
+class TestCodec(unittest.TestCase):
+    """Test the codec module"""
+
+    def test_available_codecs(self):
+        """Test that the stdlib codec is always there and one is picked"""
+        self.assertIn("json", codec.codecs)
+        self.assertIn(codec.name, codec.codecs)
+
+    def test_dumps_datetime(self):
+        """Test that datetimes are encoded like BaseModel.to_dict does"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        dates = [datetime(2021, 9, 19, 13, 41, 44),
+                 datetime(2021, 9, 19, 13, 41, 44, 123)]
+        for name, (dumps, loads) in codec.codecs.items():
+            for date in dates:
+                with self.subTest(codec=name, date=date):
+                    js = json.loads(dumps({"created_at": date}))
+                    self.assertEqual(js["created_at"],
+                                     date.strftime(t_format))
+
+    def test_round_trip(self):
+        """Test that loads reverses dumps"""
+        obj = {"name": "Café", "number": 3, "price": 1.5, "ids": ["a", "b"]}
+        for name, (dumps, loads) in codec.codecs.items():
+            with self.subTest(codec=name):
+                self.assertEqual(loads(dumps(obj)), obj)
+        self.assertEqual(json.loads(codec.dumps(obj, indent=2)), obj)
+
+    def test_dumps_wide_integers(self):
+        """Test that integers wider than 64 bits are encoded by every
+        codec, as the json module encodes them"""
+        obj = {"number_rooms": 10 ** 20, "price": -2 ** 70}
+        for name, (dumps, loads) in codec.codecs.items():
+            with self.subTest(codec=name):
+                self.assertEqual(json.loads(dumps(obj)), obj)
+        self.assertEqual(json.loads(codec.dumps(obj)), obj)
+
+    def test_dumps_default(self):
+        """Test that default encodes the values the codec does not know,
+        datetimes still being formatted by the codec"""
+        date = datetime(2021, 9, 19, 13, 41, 44, 123)
+        obj = {"price": Decimal("1.50"), "created_at": date}
+        js = json.loads(codec.dumps(obj, default=str))
+        self.assertEqual(js, {"price": "1.50",
+                              "created_at": codec.timestamp(date)})
+        with self.assertRaises(TypeError):
+            codec.dumps(obj)
+
+    def test_timestamp(self):
+        """Test that timestamp formats like strftime, cached or not"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        dates = [datetime(2021, 9, 19, 13, 41, 44),
+                 datetime(2021, 9, 19, 13, 41, 44, 123),
+                 datetime(2021, 9, 19, 13, 41, 44, 123, timezone.utc)]
+        for date in dates + dates:
+            with self.subTest(date=date):
+                self.assertEqual(codec.timestamp(date),
+                                 date.strftime(t_format))
+
+    def test_parse_timestamp(self):
+        """Test that parse_timestamp parses like strptime"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        for string in ["2021-09-19T13:41:44.000123", "2021-09-19T13:41:44.5",
+                       "2021-09-19T13:41:44.123456"]:
+            with self.subTest(string=string):
+                self.assertEqual(codec.parse_timestamp(string),
+                                 datetime.strptime(string, t_format))
+        for string in ["2021-09-19T13:41:44", "2021-09-19T13:41:44.12+0000",
+                       "2021-09-19 13:41:44.123456", "not a timestamp"]:
+            with self.subTest(string=string):
+                with self.assertRaises(ValueError):
+                    codec.parse_timestamp(string)
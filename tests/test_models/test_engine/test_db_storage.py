@@ -15,6 +15,7 @@ from models.review import Review
 from models.state import State
 from models.user import User
 import json
+from sqlalchemy import event
 import os
 import pep8
 import unittest
@@ -86,3 +87,213 @@ class TestFileStorage(unittest.TestCase):
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_save(self):
         """Test that save properly saves objects to file.json"""
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_pool_stats(self):
+        """Test that pool_stats counts the checkouts of the pool"""
+        before = models.storage.pool_stats()
+        models.storage.close()
+        models.storage.count(State)
+        after = models.storage.pool_stats()
+        self.assertGreater(after["checkouts"], before["checkouts"])
+        self.assertGreaterEqual(after["wait_seconds"], before["wait_seconds"])
+        self.assertEqual(after["timeouts"], before["timeouts"])
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_pool_stats_wait(self):
+        """Test that pool_stats times the checkouts of any connection"""
+        if models.storage.pool_stats()["pool"] != "QueuePool":
+            self.skipTest("the pool of the database has no queue")
+        engine = models.storage._DBStorage__engine
+        models.storage.close()
+        engine.dispose()
+        for connect in [engine.connect, engine.execution_options(
+                isolation_level="AUTOCOMMIT").connect]:
+            before = models.storage.pool_stats()
+            connect().close()
+            after = models.storage.pool_stats()
+            self.assertEqual(after["checkouts"], before["checkouts"] + 1)
+            self.assertGreater(after["wait_seconds"], before["wait_seconds"])
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_add_indexes(self):
+        """Test that the tables reload creates have the declared indexes"""
+        self.assertEqual(models.storage.add_indexes(dry_run=True), [])
+        self.assertEqual(models.storage.add_indexes(), [])
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestDBStorageSQL(unittest.TestCase):
+    """Test the SQL paths of DBStorage, e.g. against
+    HBNB_TYPE_STORAGE=db HBNB_DB_URL=sqlite:///test.db"""
+
+    def setUp(self):
+        """stores two states, their cities and a few places"""
+        storage = models.storage
+        self.user = User(email="sql@hbnb.io", password="pwd")
+        self.states = [State(name="California"), State(name="Arizona")]
+        self.cities = [City(name="San Francisco", state_id=self.states[0].id),
+                       City(name="Fresno", state_id=self.states[0].id),
+                       City(name="Phoenix", state_id=self.states[1].id)]
+        self.places = [Place(name=name, city_id=self.cities[i].id,
+                             user_id=self.user.id, price_by_night=price,
+                             description=description)
+                       for name, i, price, description in
+                       [("Loft", 0, 120, "view"), ("Flat", 0, 80, None),
+                        ("Barn", 1, 40, "farm"), ("Ranch", 2, 80, None)]]
+        for obj in [self.user] + self.states + self.cities + self.places:
+            storage.new(obj)
+        storage.save()
+        storage.close()
+        self.city_ids = [city.id for city in self.cities]
+
+    def tearDown(self):
+        """deletes the objects setUp stored, children first"""
+        storage = models.storage
+        storage.close()
+        for obj in self.places + self.cities + self.states + [self.user]:
+            obj = storage.get(type(obj), obj.id)
+            if obj is not None:
+                storage.delete(obj)
+                storage.save()
+        storage.close()
+
+    def names(self, query):
+        """returns the names of the places of setUp query yields"""
+        return [place.name for place in
+                query.filter(city_id__in=self.city_ids)]
+
+    def python(self, query):
+        """returns the names query yields when run in Python over the
+        same places"""
+        places = models.storage.all(Place).values()
+        return [place.name for place in
+                query.filter(city_id__in=self.city_ids).apply(places)]
+
+    def test_get_and_get_many(self):
+        """Test that get and get_many select by id"""
+        storage = models.storage
+        state = storage.get(State, self.states[0].id)
+        self.assertEqual(state.name, "California")
+        self.assertIs(storage.get("State", state.id), state)
+        self.assertIsNone(storage.get(State, "not-an-id"))
+        self.assertIsNone(storage.get(City, state.id))
+        ids = [self.states[1].id, "not-an-id", self.states[0].id]
+        self.assertEqual([s.name for s in storage.get_many(State, ids)],
+                         ["Arizona", "California"])
+
+    def test_query_filter(self):
+        """Test that the criteria are translated to SQL"""
+        query = models.storage.query(Place).order_by("name")
+        self.assertEqual(self.names(query.filter(city_id=self.city_ids[0])),
+                         ["Flat", "Loft"])
+        self.assertEqual(self.names(query.filter(price_by_night__lt=80)),
+                         ["Barn"])
+        self.assertEqual(self.names(query.filter(price_by_night__ge=80,
+                                                 name__ne="Loft")),
+                         ["Flat", "Ranch"])
+        self.assertEqual(self.names(query.filter(name__in=["Barn", "Loft"])),
+                         ["Barn", "Loft"])
+
+    def test_query_order_by_and_limit(self):
+        """Test that order_by and limit are translated to SQL"""
+        query = models.storage.query("Place")
+        self.assertEqual(self.names(query.order_by("-price_by_night",
+                                                   "name")),
+                         ["Loft", "Flat", "Ranch", "Barn"])
+        self.assertEqual(self.names(query.order_by("price_by_night",
+                                                   "-name").limit(2)),
+                         ["Barn", "Ranch"])
+
+    def test_query_none(self):
+        """Test that None compares in SQL as Query.match compares it"""
+        query = models.storage.query(Place).order_by("name")
+        for criteria, names in [({"description": None}, ["Flat", "Ranch"]),
+                                ({"description__ne": "view"},
+                                 ["Barn", "Flat", "Ranch"]),
+                                ({"description__ne": None}, ["Barn", "Loft"]),
+                                ({"description__in": ["farm", None]},
+                                 ["Barn", "Flat", "Ranch"]),
+                                ({"description__gt": "a"}, ["Barn", "Loft"])]:
+            with self.subTest(criteria=criteria):
+                self.assertEqual(self.names(query.filter(**criteria)), names)
+                self.assertEqual(self.python(query.filter(**criteria)),
+                                 names)
+
+    def test_count_and_counts(self):
+        """Test that count and counts match the rows of each class"""
+        storage = models.storage
+        counts = storage.counts()
+        self.assertEqual(sorted(counts), sorted(classes))
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], len(storage.all(cls)))
+            self.assertEqual(storage.count(name), counts[name])
+        self.assertEqual(storage.count(), sum(counts.values()))
+        self.assertEqual(storage.count(BaseModel), 0)
+
+    def test_count_cache(self):
+        """Test that the cached counts follow the commits and rollbacks,
+        pending and flushed objects included"""
+        storage = DBStorage()
+        storage._DBStorage__count_cache = True
+        storage.reload()
+        session = storage._DBStorage__session
+
+        def rows():
+            # a storage without cache counts the committed rows
+            fresh = DBStorage()
+            fresh.reload()
+            count = fresh.count(State)
+            fresh.close()
+            return count
+        base = storage.count(State)
+        self.assertEqual(base, rows())
+        state = State(name="Oregon")
+        storage.new(state)
+        self.assertEqual(storage.count(State), base + 1)
+        storage.save()
+        self.assertEqual(storage.count(State), base + 1)
+        self.assertEqual(storage.counts()["State"], base + 1)
+        self.assertEqual(rows(), base + 1)
+        storage.new(State(name="Nevada"))
+        self.assertEqual(storage.counts()["State"], base + 2)
+        session.rollback()
+        self.assertEqual(storage.count(State), base + 1)
+        storage.delete(storage.get(State, state.id))
+        storage.save()
+        self.assertEqual(storage.count(State), base)
+        self.assertEqual(storage.counts()["State"], base)
+        self.assertEqual(rows(), base)
+        storage.close()
+
+    def test_iter(self):
+        """Test that iter yields every row, batch_size at a time"""
+        storage = models.storage
+        ids = sorted(place.id for place in storage.iter(Place, batch_size=1)
+                     if place.city_id in self.city_ids)
+        self.assertEqual(ids, sorted(place.id for place in self.places))
+        self.assertEqual(sorted(o.id for o in storage.iter()),
+                         sorted(o.id for o in storage.all().values()))
+
+    def test_all_load(self):
+        """Test that loading hints render states, cities and places in a
+        constant number of queries"""
+        storage = models.storage
+        engine = storage._DBStorage__engine
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            states = storage.all(State, load=["cities.places"])
+            places = {state.name: sorted(place.name for city in state.cities
+                                         for place in city.places)
+                      for state in states.values()}
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        self.assertEqual(places["California"], ["Barn", "Flat", "Loft"])
+        self.assertEqual(places["Arizona"], ["Ranch"])
+        self.assertEqual(len(statements), 3)
+        with self.assertRaises(ValueError):
+            storage.all(State, load=["reviews"])
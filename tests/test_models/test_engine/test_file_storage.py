@@ -6,7 +6,7 @@ Contains the TestFileStorageDocs classes
 from datetime import datetime
 import inspect
 import models
-from models.engine import file_storage
+from models.engine import codec, file_storage
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -17,7 +17,10 @@ from models.user import User
 import json
 import os
 import pep8
+import threading
+import time
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -70,6 +73,17 @@ test_file_storage.py'])
 
 class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
+    def setUp(self):
+        """Pin the default mode whatever the HBNB_FILE_* variables say"""
+        modes = {"file_path": "file.json", "format": "json", "journal": 0,
+                 "commit_ms": 0, "flush_ms": 0, "lazy": False,
+                 "mmap": False, "shards": 0}
+        for name, value in modes.items():
+            patcher = mock.patch.object(FileStorage,
+                                        "_FileStorage__" + name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_all_returns_dict(self):
         """Test that all returns the FileStorage.__objects attr"""
@@ -92,6 +106,9 @@ class TestFileStorage(unittest.TestCase):
                 storage.new(instance)
                 test_dict[instance_key] = instance
                 self.assertEqual(test_dict, storage._FileStorage__objects)
+        # the other registries of the storage hold the instances as well
+        for instance in test_dict.values():
+            storage.delete(instance)
         FileStorage._FileStorage__objects = save
 
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
@@ -113,3 +130,637 @@ class TestFileStorage(unittest.TestCase):
         with open("file.json", "r") as f:
             js = f.read()
         self.assertEqual(json.loads(string), json.loads(js))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get(self):
+        """Test that get returns the object matching the class and id"""
+        storage = FileStorage()
+        state = State(name="California")
+        storage.new(state)
+        self.assertIs(storage.get(State, state.id), state)
+        self.assertIs(storage.get("State", state.id), state)
+        self.assertIsNone(storage.get(City, state.id))
+        self.assertIsNone(storage.get(State, "not-an-id"))
+        self.assertIsNone(storage.get(int, state.id))
+        storage.delete(state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get_many(self):
+        """Test that get_many returns the found objects in order"""
+        storage = FileStorage()
+        states = [State(name="Texas"), State(name="Utah")]
+        for state in states:
+            storage.new(state)
+        ids = [states[1].id, "not-an-id", states[0].id]
+        self.assertEqual(storage.get_many(State, ids),
+                         [states[1], states[0]])
+        self.assertEqual(storage.get_many(City, ids), [])
+        for state in states:
+            storage.delete(state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_cls_and_count(self):
+        """Test that all(cls) and count(cls) only see objects of cls"""
+        storage = FileStorage()
+        state = State(name="Ohio")
+        city = City(name="Akron", state_id=state.id)
+        storage.new(state)
+        storage.new(city)
+        states = storage.all(State)
+        self.assertIn("State." + state.id, states)
+        self.assertNotIn("City." + city.id, states)
+        self.assertEqual(states, storage.all("State"))
+        self.assertEqual(storage.count(State), len(states))
+        self.assertEqual(storage.count("City"), len(storage.all(City)))
+        count = storage.count()
+        storage.delete(state)
+        self.assertNotIn("State." + state.id, storage.all(State))
+        self.assertEqual(storage.count(), count - 1)
+        storage.delete(city)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_children(self):
+        """Test that children follows the foreign key indexes"""
+        storage = FileStorage()
+        state = State(name="Oregon")
+        other = State(name="Nevada")
+        city = City(name="Portland", state_id=state.id)
+        for obj in [state, other, city]:
+            storage.new(obj)
+        self.assertEqual(storage.children(City, "state_id", state.id),
+                         [city])
+        self.assertEqual(state.cities, [city])
+        city.state_id = other.id
+        self.assertEqual(state.cities, [])
+        self.assertEqual(other.cities, [city])
+        storage.delete(city)
+        self.assertEqual(other.cities, [])
+        for obj in [state, other]:
+            storage.delete(obj)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_iter(self):
+        """Test that iter yields the objects all returns"""
+        storage = FileStorage()
+        state = State()
+        storage.new(state)
+        self.assertIn(state, list(storage.iter(State)))
+        self.assertEqual(list(storage.iter("State", batch_size=1)),
+                         list(storage.all(State).values()))
+        self.assertEqual(sorted(o.id for o in storage.iter()),
+                         sorted(o.id for o in storage.all().values()))
+        storage.delete(state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_load(self):
+        """Test that load names the relationships to load along"""
+        storage = FileStorage()
+        state = State(name="Georgia")
+        city = City(name="Atlanta", state_id=state.id)
+        storage.new(state)
+        storage.new(city)
+        states = storage.all(State, load=["cities.places"])
+        self.assertEqual(states, storage.all(State))
+        self.assertEqual(states["State." + state.id].cities, [city])
+        self.assertIs(storage.get(State, state.id, load=["cities"]), state)
+        self.assertEqual(list(storage.iter(State, load=["cities"])),
+                         list(states.values()))
+        with self.assertRaises(ValueError):
+            storage.all(State, load=["places"])
+        with self.assertRaises(ValueError):
+            storage.get(State, state.id, load=["cities.state"])
+        storage.delete(city)
+        storage.delete(state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_counts(self):
+        """Test that counts returns the count of every model class"""
+        storage = FileStorage()
+        state = State()
+        storage.new(state)
+        counts = storage.counts()
+        self.assertEqual(sorted(counts), ["Amenity", "City", "Place",
+                                          "Review", "State", "User"])
+        for name, count in counts.items():
+            self.assertEqual(count, storage.count(name))
+        storage.delete(state)
+        self.assertEqual(storage.counts()["State"], counts["State"] - 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_query(self):
+        """Test that query filters through the indexes, orders and limits"""
+        storage = FileStorage()
+        city = City(name="Atlanta")
+        places = [Place(name="P{}".format(i), city_id=city.id,
+                        price_by_night=i * 50) for i in range(5)]
+        other = Place(name="P9", city_id="elsewhere", price_by_night=10)
+        for obj in [city, other] + places:
+            storage.new(obj)
+        query = storage.query(Place).filter(city_id=city.id,
+                                            price_by_night__lt=200)
+        self.assertEqual([p.name for p in query.order_by("-name").limit(2)],
+                         ["P3", "P2"])
+        with mock.patch.object(FileStorage, "all") as all:
+            self.assertEqual(len(list(query)), 4)
+            self.assertFalse(all.called)
+        self.assertIn(other, list(storage.query("Place").filter(
+            price_by_night__in=[10])))
+        self.assertEqual(list(storage.query("Nope")), [])
+        for obj in [city, other] + places:
+            storage.delete(obj)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_reloads_only_changes(self):
+        """Test that close keeps unchanged objects and applies changes"""
+        storage = FileStorage()
+        state = State(name="Idaho")
+        storage.new(state)
+        storage.save()
+        key = "State." + state.id
+        storage.close()
+        self.assertIs(storage.all()[key], state)
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        js[key]["name"] = "Iowa"
+        js[key]["updated_at"] = "2030-01-01T00:00:00.000000"
+        with open("file.json", "w") as f:
+            json.dump(js, f, indent=1)
+        storage.close()
+        self.assertIsNot(storage.all()[key], state)
+        self.assertEqual(storage.all()[key].name, "Iowa")
+        del js[key]
+        with open("file.json", "w") as f:
+            json.dump(js, f)
+        storage.close()
+        self.assertNotIn(key, storage.all())
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_journal(self):
+        """Test that journal mode appends changes and compacts them"""
+        storage = FileStorage()
+        patcher = mock.patch.object(FileStorage, "_FileStorage__journal", 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for path in ["file.json", "file.json.journal"]:
+            if os.path.exists(path):
+                os.remove(path)
+        state = State(name="Maine")
+        storage.new(state)
+        storage.save()
+        key = "State." + state.id
+        self.assertFalse(os.path.exists("file.json.journal"))
+        state.name = "Vermont"
+        state.save()
+        city = City(name="Burlington", state_id=state.id)
+        city.save()
+        with open("file.json.journal", "r") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]["record"]["name"], "Vermont")
+        with open("file.json", "r") as f:
+            self.assertEqual(json.load(f)[key]["name"], "Maine")
+        storage.delete(state)
+        FileStorage._FileStorage__loaded.clear()
+        storage.reload()
+        self.assertEqual(storage.all()[key].name, "Vermont")
+        storage.delete(storage.all()[key])
+        storage.delete(city)
+        storage.save()
+        self.assertFalse(os.path.exists("file.json.journal"))
+        with open("file.json", "r") as f:
+            self.assertNotIn(key, json.load(f))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_journal_torn(self):
+        """Test that the entries saved after a torn journal line survive"""
+        storage = FileStorage()
+        for path in ["file.json", "file.json.journal"]:
+            if os.path.exists(path):
+                os.remove(path)
+        storage.save()
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        with mock.patch.object(FileStorage, "_FileStorage__journal", 100):
+            for state in states[:2]:
+                state.save()
+            with open("file.json.journal", "a") as f:
+                f.write('{"key": "State.torn", "rec')
+            storage.save()
+            FileStorage._FileStorage__loaded.clear()
+            storage.reload()
+            for state in states[2:4]:
+                state.save()
+            with open("file.json.journal", "a") as f:
+                f.write('{"key": "State.torn", "rec')
+            # an append without a reload in between
+            states[4].save()
+            with open("file.json.journal", "r") as f:
+                lines = f.read().splitlines()
+            self.assertEqual(len(lines), 6)
+            self.assertEqual(lines[4], '{"key": "State.torn", "rec')
+            for state in states:
+                storage.delete(state)
+            FileStorage._FileStorage__loaded.clear()
+            storage.reload()
+            keys = storage.all(State)
+            for state in states:
+                self.assertIn("State." + state.id, keys)
+                storage.delete(keys["State." + state.id])
+            self.assertNotIn("State.torn", keys)
+        storage.save()
+        self.assertFalse(os.path.exists("file.json.journal"))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_only_serializes_dirty(self):
+        """Test that save only serializes the objects changed since the
+        last save, saved again or not, and reuses the JSON of the others"""
+        storage = FileStorage()
+        state = State(name="Alaska")
+        other = State(name="Hawaii")
+        unchanged = State(name="Iowa")
+        for obj in [state, other, unchanged]:
+            storage.new(obj)
+        storage.save()
+        serialize = FileStorage._FileStorage__serialize
+        with mock.patch.object(FileStorage, "_FileStorage__serialize",
+                               autospec=True, side_effect=serialize) as m:
+            other.name = "Guam"
+            state.name = "Kansas"
+            state.save()
+        serialized = [call.args[1] for call in m.call_args_list]
+        self.assertEqual(sorted(serialized),
+                         sorted(["State." + state.id, "State." + other.id]))
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        self.assertEqual(js["State." + state.id]["name"], "Kansas")
+        self.assertEqual(js["State." + other.id]["name"], "Guam")
+        self.assertEqual(js["State." + unchanged.id]["name"], "Iowa")
+        for obj in [state, other, unchanged]:
+            storage.delete(obj)
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_is_atomic(self):
+        """Test that save replaces file.json without leaving a temp file"""
+        storage = FileStorage()
+        state = State(name="Texas")
+        storage.new(state)
+        storage.save()
+        self.assertEqual([name for name in os.listdir(".")
+                          if name.endswith(".tmp")], [])
+        with open("file.json", "r") as f:
+            self.assertIn("State." + state.id, json.load(f))
+        storage.delete(state)
+        with mock.patch("os.replace", side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.save()
+        self.assertEqual([name for name in os.listdir(".")
+                          if name.endswith(".tmp")], [])
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_group_commit(self):
+        """Test that saves issued within the window share one write"""
+        storage = FileStorage()
+        states = [State(name="State {}".format(i)) for i in range(8)]
+        threads = [threading.Thread(target=state.save) for state in states]
+        write = FileStorage._FileStorage__save
+        with mock.patch.object(FileStorage, "_FileStorage__commit_ms", 50), \
+            mock.patch.object(FileStorage, "_FileStorage__save",
+                              autospec=True, side_effect=write) as m:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLess(m.call_count, len(states))
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        for state in states:
+            self.assertIn("State." + state.id, js)
+            storage.delete(state)
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_group_commit_concurrent(self):
+        """Test that the writes of the group commit leaders see every
+        object saved by the other threads meanwhile"""
+        storage = FileStorage()
+        states = [[State(name="State {}".format(i)) for i in range(300)]
+                  for thread in range(4)]
+
+        def save(states):
+            for state in states:
+                state.save()
+        threads = [threading.Thread(target=save, args=(chunk,))
+                   for chunk in states]
+        with mock.patch.object(FileStorage, "_FileStorage__commit_ms", 1):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(storage._FileStorage__dirty, {})
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        for chunk in states:
+            for state in chunk:
+                self.assertIn("State." + state.id, js)
+                storage.delete(state)
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_background_flush(self):
+        """Test that the flusher survives saves issued by several threads
+        and writes every object without an explicit flush"""
+        storage = FileStorage()
+        states = [[State(name="State {}".format(i)) for i in range(500)]
+                  for thread in range(4)]
+
+        def save(states):
+            for state in states:
+                state.save()
+        threads = [threading.Thread(target=save, args=(chunk,))
+                   for chunk in states]
+        with mock.patch.object(FileStorage, "_FileStorage__flush_ms", 1):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            flusher = FileStorage._FileStorage__flusher
+            self.addCleanup(flusher.join)
+            self.assertTrue(flusher.is_alive())
+            for i in range(500):
+                if not FileStorage._FileStorage__pending:
+                    break
+                time.sleep(0.01)
+            with storage._FileStorage__commit:
+                self.assertFalse(FileStorage._FileStorage__pending)
+                with open("file.json", "r") as f:
+                    js = json.load(f)
+        flusher.join()
+        for chunk in states:
+            for state in chunk:
+                self.assertIn("State." + state.id, js)
+                storage.delete(state)
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_batch(self):
+        """Test that saves within batch() are written once at the end"""
+        storage = FileStorage()
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        write = FileStorage._FileStorage__save
+        with mock.patch.object(FileStorage, "_FileStorage__save",
+                               autospec=True, side_effect=write) as m:
+            with storage.batch():
+                for state in states:
+                    state.save()
+                with storage.batch():
+                    storage.save()
+                self.assertEqual(m.call_count, 0)
+            self.assertEqual(m.call_count, 1)
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        for state in states:
+            self.assertIn("State." + state.id, js)
+            storage.delete(state)
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_streaming(self):
+        """Test that reload reads any JSON layout and reports progress"""
+        storage = FileStorage()
+        states = [State(name="State {}".format(i)) for i in range(3)]
+        js = {}
+        for state in states:
+            js["State." + state.id] = state.to_dict()
+        for indent in [None, 2]:
+            with self.subTest(indent=indent):
+                with open("file.json", "w") as f:
+                    json.dump(js, f, indent=indent)
+                FileStorage._FileStorage__loaded.clear()
+                calls = []
+                storage.reload(progress=lambda *args: calls.append(args))
+                for state in states:
+                    key = "State." + state.id
+                    self.assertEqual(storage.all()[key].name, state.name)
+                    storage.delete(storage.all()[key])
+                self.assertEqual(calls[-1][0], 3)
+                self.assertEqual(calls[-1][1], calls[-1][2])
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_interns_foreign_keys(self):
+        """Test that reloaded objects share their foreign key strings"""
+        storage = FileStorage()
+        state = State(name="Georgia")
+        cities = [City(name=name, state_id=state.id)
+                  for name in ["Atlanta", "Savannah"]]
+        for obj in [state] + cities:
+            storage.new(obj)
+        storage.save()
+        for obj in [state] + cities:
+            storage.delete(obj)
+        FileStorage._FileStorage__loaded.clear()
+        storage.reload()
+        first, second = [storage.get(City, city.id) for city in cities]
+        self.assertIsNot(first, cities[0])
+        self.assertIs(first.state_id, second.state_id)
+        for obj in [first, second, storage.get(State, state.id)]:
+            storage.delete(obj)
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_escaped_keys(self):
+        """Test that ids holding quotes, backslashes and non-ASCII
+        characters are read back, eagerly or lazily, whatever the codec"""
+        storage = FileStorage()
+        ids = ['a": {b', 'q\\z', 'ç1', 'tab\t"\\"']
+        for name in ["json", codec.name]:
+            for lazy in [False, True]:
+                with self.subTest(codec=name, lazy=lazy), \
+                        mock.patch.object(codec, "_dumps",
+                                          codec.codecs[name][0]), \
+                        mock.patch.object(FileStorage,
+                                          "_FileStorage__lazy", lazy):
+                    states = [State(id=id, name=id) for id in ids]
+                    for state in states:
+                        storage.new(state)
+                    storage.save()
+                    for state in states:
+                        storage.delete(state)
+                    FileStorage._FileStorage__loaded.clear()
+                    storage.reload()
+                    for id in ids:
+                        state = storage.get("State", id)
+                        self.assertIsNotNone(state)
+                        self.assertEqual(state.name, id)
+                        storage.delete(state)
+                    storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_lazy(self):
+        """Test that lazy mode instantiates records on first access"""
+        storage = FileStorage()
+        state = State(name="Georgia")
+        city = City(name="Atlanta", state_id=state.id)
+        for obj in [state, city]:
+            storage.new(obj)
+        storage.save()
+        for obj in [state, city]:
+            storage.delete(obj)
+        FileStorage._FileStorage__loaded.clear()
+        with mock.patch.object(FileStorage, "_FileStorage__lazy", True):
+            storage.reload()
+        key = "State." + state.id
+        count = storage.count()
+        self.assertNotIn(key, FileStorage._FileStorage__objects)
+        self.assertEqual(storage.count(State), len(storage.all(State)))
+        self.assertEqual(storage.count(), count)
+        loaded = storage.get(State, state.id)
+        self.assertEqual(loaded.name, "Georgia")
+        self.assertIs(storage.get(State, state.id), loaded)
+        self.assertEqual([c.name for c in loaded.cities], ["Atlanta"])
+        storage.save()
+        with open("file.json", "r") as f:
+            self.assertIn(key, json.load(f))
+        storage.delete(loaded)
+        storage.delete(loaded.cities[0])
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_reload_mmap(self):
+        """Test that mapped mode decodes the records on first access"""
+        storage = FileStorage()
+        self.addCleanup(self.unmap, storage)
+        for name, value in [("file_path", "file.bin"), ("mmap", True)]:
+            patcher = mock.patch.object(FileStorage,
+                                        "_FileStorage__" + name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        state = State(name="Georgia")
+        city = City(name="Atlanta", state_id=state.id)
+        for obj in [state, city]:
+            storage.new(obj)
+        storage.save()
+        count = storage.count()
+        for obj in [state, city]:
+            storage.delete(obj)
+        FileStorage._FileStorage__dirty.clear()
+        storage.reload()
+        key = "State." + state.id
+        self.assertNotIn(key, FileStorage._FileStorage__objects)
+        self.assertEqual(storage.count(), count)
+        loaded = storage.get(State, state.id)
+        self.assertEqual(loaded.name, "Georgia")
+        self.assertIs(storage.get(State, state.id), loaded)
+        self.assertEqual(storage.count(), count)
+        self.assertEqual([c.name for c in loaded.cities], ["Atlanta"])
+        self.assertEqual(storage.count(State), len(storage.all(State)))
+        loaded.name = "GA"
+        storage.new(loaded)
+        storage.save()
+        FileStorage._FileStorage__dirty.clear()
+        storage.reload()
+        self.assertEqual(storage.get(State, state.id).name, "GA")
+        storage.delete(storage.get(State, state.id))
+        storage.save()
+        storage.reload()
+        self.assertIsNone(storage.get(State, state.id))
+        self.assertEqual(storage.count(), count - 1)
+        storage.delete(storage.get(City, city.id))
+        storage.save()
+
+    def unmap(self, storage):
+        """Decode what is left mapped and go back to file.json"""
+        if FileStorage._FileStorage__mapped is not None:
+            storage.all()
+            FileStorage._FileStorage__mapped.close()
+            FileStorage._FileStorage__mapped = None
+            FileStorage._FileStorage__shadowed.clear()
+        if os.path.exists("file.bin"):
+            os.remove("file.bin")
+        storage.save()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_sharded(self):
+        """Test that sharded mode stores and loads each class on its own"""
+        storage = FileStorage()
+        self.addCleanup(self.unshard)
+        patcher = mock.patch.object(FileStorage, "_FileStorage__shards", 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        state = State(name="Georgia")
+        city = City(name="Atlanta", state_id=state.id)
+        amenity = Amenity(name="Wifi")
+        for obj in [state, city, amenity]:
+            storage.new(obj)
+        storage.save()
+        with open("file.State.json", "r") as f:
+            keys = json.load(f)
+        self.assertIn("State." + state.id, keys)
+        self.assertTrue(all(key.startswith("State.") for key in keys))
+        stamp = os.stat("file.City.json").st_mtime_ns
+        amenity.name = "Pool"
+        storage.new(amenity)
+        storage.save()
+        self.assertEqual(os.stat("file.City.json").st_mtime_ns, stamp)
+        with open("file.Amenity.json", "r") as f:
+            self.assertEqual(json.load(f)["Amenity." + amenity.id]["name"],
+                             "Pool")
+        for obj in [state, city, amenity]:
+            storage.delete(obj)
+        FileStorage._FileStorage__dirty.clear()
+        FileStorage._FileStorage__shard_stamps.clear()
+        FileStorage._FileStorage__shard_keys.clear()
+        loaded = storage.get(State, state.id)
+        self.assertEqual(loaded.name, "Georgia")
+        self.assertNotIn("City." + city.id, FileStorage._FileStorage__objects)
+        self.assertEqual([c.name for c in loaded.cities], ["Atlanta"])
+        for obj in [loaded, loaded.cities[0], storage.get(Amenity,
+                                                          amenity.id)]:
+            storage.delete(obj)
+        storage.save()
+        with mock.patch.object(FileStorage, "_FileStorage__shards", 3):
+            amenities = [Amenity(name=str(i)) for i in range(12)]
+            for obj in amenities:
+                storage.new(obj)
+            storage.save()
+            keys = {}
+            for n in range(3):
+                with open("file.Amenity.{}.json".format(n), "r") as f:
+                    keys.update(json.load(f))
+            for obj in amenities:
+                self.assertEqual(keys["Amenity." + obj.id]["name"],
+                                 obj.name)
+                storage.delete(obj)
+            storage.save()
+
+    def unshard(self):
+        """Remove the shard files written by a test in sharded mode"""
+        for path in FileStorage._FileStorage__shard_stamps:
+            if os.path.exists(path):
+                os.remove(path)
+        FileStorage._FileStorage__shard_stamps.clear()
+        FileStorage._FileStorage__shard_keys.clear()
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_binary(self):
+        """Test that the binary format saves and reloads the objects"""
+        storage = FileStorage()
+        place = Place(name="Cabin", number_rooms=2, latitude=4.5)
+        with mock.patch.object(FileStorage, "_FileStorage__file_path",
+                               "file.bin"):
+            with mock.patch.object(FileStorage, "_FileStorage__format",
+                                   "binary"):
+                storage.new(place)
+                storage.save()
+            with open("file.bin", "rb") as f:
+                self.assertTrue(f.read().startswith(b"HBNBSNP1"))
+            storage.delete(place)
+            FileStorage._FileStorage__loaded.clear()
+            storage.reload()
+            os.remove("file.bin")
+        loaded = storage.get(Place, place.id)
+        self.assertIsNot(loaded, place)
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+        storage.delete(loaded)
+        storage.save()
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+"""
+Contains the TestQuery classes
+"""
+
+from models.engine import query
+from models.engine.query import Query
+import pep8
+import unittest
+
+
+class Item:
+    """object queried by the tests"""
+
+    def __init__(self, name, price=None):
+        """sets the attributes of the item"""
+        self.name = name
+        self.price = price
+
+
+class TestQueryDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the query module"""
+
+    def test_pep8_conformance_query(self):
+        """Test that models/engine/query.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/query.py',
+                                    'tests/test_models/test_engine/\
+test_query.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_query_module_docstring(self):
+        """Test for the query.py module docstring"""
+        self.assertIsNot(query.__doc__, None,
+                         "query.py needs a docstring")
+
+
+class TestQuery(unittest.TestCase):
+    """Test the Query class run in Python"""
+
+    def setUp(self):
+        """builds a query run over a few items"""
+        self.items = [Item("c", 30), Item("a", 10), Item("b", None),
+                      Item("d", 10)]
+        self.query = Query(lambda q: q.apply(self.items), Item)
+
+    def names(self, query):
+        """returns the names of the items the query yields"""
+        return [item.name for item in query]
+
+    def test_filter(self):
+        """Test that the criteria are combined"""
+        self.assertEqual(self.names(self.query.filter(price=10)), ["a", "d"])
+        self.assertEqual(self.names(self.query.filter(price__ge=10,
+                                                      name__ne="a")),
+                         ["c", "d"])
+        self.assertEqual(self.names(self.query.filter(name__in=["b", "c"])),
+                         ["c", "b"])
+        self.assertEqual(self.names(self.query.filter(price__lt=20)),
+                         ["a", "d"])
+        with self.assertRaises(ValueError):
+            self.query.filter(price__like=1)
+
+    def test_order_by_and_limit(self):
+        """Test ordering, None first, and limits"""
+        self.assertEqual(self.names(self.query.order_by("name")),
+                         ["a", "b", "c", "d"])
+        self.assertEqual(self.names(self.query.order_by("price", "-name")),
+                         ["b", "d", "a", "c"])
+        self.assertEqual(self.names(self.query.order_by("-price").limit(2)),
+                         ["c", "a"])
+        self.assertEqual(self.names(self.query.limit(1)), ["c"])
+
+    def test_steps_return_new_queries(self):
+        """Test that refining a query leaves it unchanged, and that it only
+        runs when iterated"""
+        runs = []
+        query = Query(lambda q: runs.append(q) or [], Item)
+        limited = query.filter(price=10).limit(1)
+        self.assertEqual(runs, [])
+        self.assertEqual(query.criteria, [])
+        self.assertIsNone(query.size)
+        self.assertEqual(list(limited), [])
+        self.assertEqual(runs, [limited])
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+"""
+Contains the TestSnapshot classes
+"""
+
+import json
+from models.engine import codec, snapshot
+from models.place import Place
+from models.state import State
+from models.user import User
+import os
+import pep8
+import unittest
+
+
+class TestSnapshotDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the snapshot module"""
+
+    def test_pep8_conformance_snapshot(self):
+        """Test that models/engine/snapshot.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/snapshot.py',
+                                    'tests/test_models/test_engine/\
+test_snapshot.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_snapshot_module_docstring(self):
+        """Test for the snapshot.py module docstring"""
+        self.assertIsNot(snapshot.__doc__, None,
+                         "snapshot.py needs a docstring")
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test the snapshot format"""
+
+    def setUp(self):
+        """builds records of several classes, some off their schema"""
+        place = Place(name="Loft", city_id="c", number_rooms=3,
+                      latitude=1.5, amenity_ids=["a", "b"])
+        user = User(email="a@b.c", password="pwd")
+        state = State(name=42)
+        state.id = "not-a-uuid"
+        self.records = {}
+        for obj in [place, user, state]:
+            key = obj.__class__.__name__ + "." + obj.id
+            self.records[key] = obj.to_dict(save_fs=1)
+
+    def formatted(self, record):
+        """returns record with its datetimes formatted as in file.json"""
+        return json.loads(codec.dumps(record))
+
+    def test_round_trip(self):
+        """Test that a snapshot gives back the records it was made of"""
+        data = snapshot.dumps(self.records.items())
+        self.assertTrue(snapshot.is_snapshot(data))
+        records = snapshot.Snapshot(data)
+        self.assertEqual(len(records), len(self.records))
+        self.assertEqual(self.formatted(dict(records)), self.records)
+        self.assertEqual(list(records.keys()), sorted(self.records))
+
+    def test_find(self):
+        """Test that find locates a record by key through the index"""
+        records = snapshot.Snapshot(snapshot.dumps(self.records.items()))
+        for key, record in self.records.items():
+            found = records.record(records.find(key))[0]
+            self.assertEqual(self.formatted(found), record)
+            self.assertEqual(records[key], found)
+        self.assertIsNone(records.find("State.missing"))
+
+    def test_smaller_than_json(self):
+        """Test that the snapshot is more compact than file.json"""
+        records = {}
+        for i in range(100):
+            place = Place(name="Place {}".format(i), city_id=self.records[
+                [key for key in self.records if key[:5] == "User."][0]
+            ]["id"])
+            records["Place." + place.id] = place.to_dict(save_fs=1)
+        self.assertLess(len(snapshot.dumps(records.items())),
+                        len(json.dumps(records)) * 0.6)
+
+    def test_convert(self):
+        """Test the conversion from file.json to a snapshot and back"""
+        with open("test_snapshot.json", "w") as f:
+            json.dump(self.records, f)
+        snapshot.convert("test_snapshot.json", "test_snapshot.bin")
+        snapshot.convert("test_snapshot.bin", "test_snapshot.json")
+        with open("test_snapshot.json", "r") as f:
+            self.assertEqual(json.load(f), self.records)
+        os.remove("test_snapshot.json")
+        os.remove("test_snapshot.bin")
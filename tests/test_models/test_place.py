@@ -196,5 +196,5 @@ class TestPlace(unittest.TestCase):
     def test_str(self):
         """test that the str method has the correct output"""
         place = Place()
-        string = "[Place] ({}) {}".format(place.id, place.__dict__)
+        string = "[Place] ({}) {}".format(place.id, place._fields())
         self.assertEqual(string, str(place))
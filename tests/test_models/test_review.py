@@ -119,5 +119,5 @@ class TestReview(unittest.TestCase):
     def test_str(self):
         """test that the str method has the correct output"""
         review = Review()
-        string = "[Review] ({}) {}".format(review.id, review.__dict__)
+        string = "[Review] ({}) {}".format(review.id, review._fields())
         self.assertEqual(string, str(review))
@@ -101,5 +101,5 @@ class TestState(unittest.TestCase):
     def test_str(self):
         """test that the str method has the correct output"""
         state = State()
-        string = "[State] ({}) {}".format(state.id, state.__dict__)
+        string = "[State] ({}) {}".format(state.id, state._fields())
         self.assertEqual(string, str(state))
@@ -128,5 +128,13 @@ class TestUser(unittest.TestCase):
     def test_str(self):
         """test that the str method has the correct output"""
         user = User()
-        string = "[User] ({}) {}".format(user.id, user.__dict__)
+        string = "[User] ({}) {}".format(user.id, user._fields())
         self.assertEqual(string, str(user))
+
+    def test_to_dict_password(self):
+        """test that the password is only serialized for the storage"""
+        u = User(email="a@b.c", password="pwd")
+        self.assertNotIn("password", u.to_dict())
+        self.assertNotIn("password", u.to_dict(save_fs=False))
+        self.assertNotIn("password", u.to_dict(save_fs=0))
+        self.assertEqual(u.to_dict(save_fs=1)["password"], u.password)